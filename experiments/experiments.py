@@ -55,26 +55,41 @@ def get_all_voters(history):
 
 def calculate_statistics(profiles, support, wins, quota_compliance,
                          quota_maxdeviation, influence, winner):
-    num_satisfied = len([v for v in profiles.voters
-                         if winner in profiles.approval_sets[v]])
-
-    cand_support = {c: 0 for c in profiles.cands}
-    for voter in profiles.voters:
-        for c in profiles.approval_sets[voter]:
-            cand_support[c] += 1
-
-    for v in profiles.voters:
-        support[v] += max([cand_support[c]
-                           for c in profiles.approval_sets[v]] + [0])
-
-        if winner in profiles.approval_sets[v]:
-            wins[v] += 1
-            influence[v] += Fraction(1, num_satisfied)
-        per_quota = Fraction(support[v], len(profiles.voters))
-        if per_quota - wins[v] < 1:
+    per_quota = calculate_quotas(profiles, support)
+    update_statistics(profiles, per_quota, (wins, quota_compliance,
+                                            quota_maxdeviation, influence),
+                      winner)
+
+
+def calculate_quotas(profile, support):
+    """Adds the support of this round and returns the per_quota of each
+    voter of profile; unlike the remaining statistics, it does not depend
+    on the winner."""
+    voter_support = profile.voter_support()
+    num_voters = len(profile.voters)
+    per_quota = {}
+    for v in profile.voters:
+        support[v] += voter_support[v]
+        per_quota[v] = Fraction(support[v], num_voters)
+    return per_quota
+
+
+def empty_statistics(voters):
+    """Returns the accumulators (wins, quota_compliance,
+    quota_maxdeviation, influence) of a rule."""
+    return tuple(dict.fromkeys(voters, 0) for _ in range(4))
+
+
+def update_statistics(profile, per_quota, statistics, winner):
+    wins, quota_compliance, quota_maxdeviation, influence = statistics
+    supporters = profile.supporters(winner)
+    for v in supporters:
+        wins[v] += 1
+        influence[v] += Fraction(1, len(supporters))
+    for v, quota in per_quota.items():
+        if quota - wins[v] < 1:
             quota_compliance[v] += 1
-        quota_maxdeviation[v] = max(quota_maxdeviation[v],
-                                    per_quota - wins[v])
+        quota_maxdeviation[v] = max(quota_maxdeviation[v], quota - wins[v])
 
 
 # calculate the Gini coefficient
@@ -140,47 +155,170 @@ def plot_data(exp_name, aver_quotacompl, max_quotadeviation,
 
 def run_exp_for_history(history, aver_quotacompl, max_quotadeviation,
                         aver_satisfaction, aver_influencegini,
-                        rules, missing_rule=None):
+                        rules, missing_rule=None, rng=None):
+    """Computes all rules round by round in a single pass over history,
+    so that the preprocessing of each profile and the per_quota
+    statistics are shared by all rules.
+
+    With missing_rule "empty" or "all", each profile is completed once
+    per round for all rules; the completed profile is not cached, so it
+    and the quantities derived from it are dropped after the round.
+
+    If rng is given, each rule draws from its own generator spawned from
+    it (see perpetual_rules.spawn_rngs), so the streams of the rules are
+    independent and the results of a rule do not depend on the other
+    rules. Without rng, all rules draw from the default generator of
+    perpetual_rules.
+    """
     voters = get_all_voters(history)
     cands = get_all_candidates(history)
 
-    for rule in rules:
-        # print "*" * (len(rule) + 4)
-        # print "*",rule.upper(),"*"
-        # print "*" * (len(rule) + 4)
-        weights = perpetual_rules.init_weights(rule, voters)
-
-        support = dict.fromkeys(voters, 0)
-        wins = dict.fromkeys(voters, 0)
-        quota_compliance = dict.fromkeys(voters, 0)
-        quota_deviation = dict.fromkeys(voters, 0)
-        influence = dict.fromkeys(voters, 0)
-
-        for profile in history:
-            winner = perpetual.compute_rule(rule, profile,
-                                            weights,
-                                            missing_rule=missing_rule)
+    weights = {rule: perpetual_rules.init_weights(rule, voters)
+               for rule in rules}
+    if rng is None:
+        rngs = dict.fromkeys(rules)
+    else:
+        rngs = dict(zip(rules, perpetual_rules.spawn_rngs(rng, len(rules))))
+    support = dict.fromkeys(voters, 0)
+    statistics = {rule: empty_statistics(voters) for rule in rules}
+    round_missing_rule = missing_rule
+    if missing_rule == "empty" or missing_rule == "all":
+        round_missing_rule = "ignore"
+    for profile in history:
+        per_quota = calculate_quotas(profile, support)
+        round_profile = profile
+        if round_missing_rule != missing_rule:
+            round_profile = profile.completed(voters, missing_rule)
+        for rule in rules:
+            winner = perpetual.compute_rule(rule, round_profile,
+                                            weights[rule],
+                                            missing_rule=round_missing_rule,
+                                            rng=rngs[rule])
             assert(winner in cands)
-            calculate_statistics(profile,
-                                 support, wins,
-                                 quota_compliance, quota_deviation,
-                                 influence, winner)
+            update_statistics(profile, per_quota, statistics[rule], winner)
+
+    for rule in rules:
+        store_statistics(rule, statistics[rule], len(history), voters,
+                         aver_quotacompl, max_quotadeviation,
+                         aver_satisfaction, aver_influencegini)
+
+
+def run_exp_for_histories(histories, aver_quotacompl, max_quotadeviation,
+                          aver_satisfaction, aver_influencegini,
+                          rules, missing_rule=None, seed=None):
+    """Same as calling run_exp_for_history for each history, but rules
+    in perpetual_rules.BATCH_RULES are computed for all histories at
+    once (see perpetual_rules.compute_rule_batch).
+
+    If batch rules are requested, all histories have to have the same
+    number of rounds and all profiles the same voters and candidates
+    (see histories_to_array); missing_rule is not applied to these
+    rules, voters with empty approval sets simply approve no candidate.
+
+    If seed is given, each history gets its own random number generator
+    (see perpetual_rules.election_rngs), from which run_exp_for_history
+    spawns one generator per rule.
+    """
+    other_rules = [rule for rule in rules
+                   if rule not in perpetual_rules.BATCH_RULES]
+    if other_rules:
+        if seed is None:
+            rngs = [None] * len(histories)
+        else:
+            rngs = perpetual_rules.election_rngs(seed, len(histories))
+        for history, rng in zip(histories, rngs):
+            run_exp_for_history(history, aver_quotacompl,
+                                max_quotadeviation, aver_satisfaction,
+                                aver_influencegini, other_rules,
+                                missing_rule, rng)
+
+    batch_rules = [rule for rule in rules
+                   if rule in perpetual_rules.BATCH_RULES]
+    if not batch_rules:
+        return
+    approvals, voters, cands = histories_to_array(histories)
+    for rule in batch_rules:
+        winner_indices = perpetual_rules.compute_rule_batch(rule,
+                                                            approvals)
+        for history, indices in zip(histories, winner_indices):
+            winners = [cands[i] for i in indices]
+            add_statistics(history, voters, winners, rule,
+                           aver_quotacompl, max_quotadeviation,
+                           aver_satisfaction, aver_influencegini)
+
+
+def histories_to_array(histories):
+    """Stacks the incidence matrices of histories into a boolean array
+    of shape (simulations, rounds, voters, candidates).
+
+    All histories have to consist of the same number of rounds and all
+    profiles have to have the same voters and candidates. Rows and
+    columns follow the voter and candidate order of the first profile.
+
+    Returns
+    -------
+    numpy.ndarray, list, list
+        The array, the list of voters and the list of candidates.
+    """
+    voters = list(histories[0][0].voters)
+    cands = list(histories[0][0].cands)
+    approvals = np.zeros((len(histories), len(histories[0]),
+                          len(voters), len(cands)), dtype=bool)
+    for s, history in enumerate(histories):
+        if len(history) != len(histories[0]):
+            raise Exception("histories differ in their number of rounds")
+        for r, prof in enumerate(history):
+            if list(prof.voters) == voters and list(prof.cands) == cands:
+                approvals[s, r] = prof.incidence
+                continue
+            if (len(prof.voters) != len(voters)
+                    or len(prof.cands) != len(cands)):
+                raise Exception("profiles differ in voters or candidates")
+            rows = [prof.voter_index[v] for v in voters]
+            columns = [prof.cand_index[c] for c in cands]
+            approvals[s, r] = prof.incidence[np.ix_(rows, columns)]
+    return approvals, voters, cands
+
+
+def add_statistics(history, voters, winners, rule, aver_quotacompl,
+                   max_quotadeviation, aver_satisfaction,
+                   aver_influencegini):
+    """Evaluates the winners chosen by a rule for a history and appends
+    the results to the lists stored for this rule."""
+    support = dict.fromkeys(voters, 0)
+    statistics = empty_statistics(voters)
+
+    for profile, winner in zip(history, winners):
+        per_quota = calculate_quotas(profile, support)
+        update_statistics(profile, per_quota, statistics, winner)
+
+    store_statistics(rule, statistics, len(history), voters,
+                     aver_quotacompl, max_quotadeviation,
+                     aver_satisfaction, aver_influencegini)
+
+
+def store_statistics(rule, statistics, num_rounds, voters, aver_quotacompl,
+                     max_quotadeviation, aver_satisfaction,
+                     aver_influencegini):
+    """Appends the results accumulated in statistics (see
+    empty_statistics) to the lists stored for this rule."""
+    wins, quota_compliance, quota_deviation, influence = statistics
 
-        quota_compliance = float(sum(quota_compliance.values()))
-        quota_compliance = (quota_compliance
-                            / len(history)
-                            / len(voters))
-        aver_quotacompl[rule].append(quota_compliance)
+    quota_compliance = float(sum(quota_compliance.values()))
+    quota_compliance = (quota_compliance
+                        / num_rounds
+                        / len(voters))
+    aver_quotacompl[rule].append(quota_compliance)
 
-        quota_deviation = float(max(quota_deviation.values()))
-        max_quotadeviation[rule].append(quota_deviation)
+    quota_deviation = float(max(quota_deviation.values()))
+    max_quotadeviation[rule].append(quota_deviation)
 
-        satisfaction = float(sum(wins.values()))
-        satisfaction = satisfaction / len(history) / len(voters)
-        aver_satisfaction[rule].append(satisfaction)
+    satisfaction = float(sum(wins.values()))
+    satisfaction = satisfaction / num_rounds / len(voters)
+    aver_satisfaction[rule].append(satisfaction)
 
-        aver_influencegini[rule].append(
-            calculate_gini(listvalues(influence)))
+    aver_influencegini[rule].append(
+        calculate_gini(listvalues(influence)))
 
 
 def statistical_significance(name, dataset):
@@ -373,7 +511,7 @@ def generate_instances(exp_specs):
                         voter_points,
                         cand_points,
                         approval_threshold)
-                    history.append(prof)
+                    history.append(prof.compact())
                 instances[str(spec)].append(history)
 
             print("writing instances to", picklefile)
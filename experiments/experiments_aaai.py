@@ -10,7 +10,7 @@ from os.path import exists
 import random
 
 import experiments
-from experiments import basic_stats, run_exp_for_history, \
+from experiments import basic_stats, run_exp_for_histories, \
     statistical_significance, plot_data
 
 
@@ -57,13 +57,12 @@ for spec in exp_specs:
     if not exists(picklefile):
         print("computing perpetual voting rules")
 
-        for history in curr_instances:
-            run_exp_for_history(history,
-                                aver_quotacompl,
-                                max_quotadeviation,
-                                aver_satisfaction,
-                                aver_influencegini,
-                                rules)
+        run_exp_for_histories(curr_instances,
+                              aver_quotacompl,
+                              max_quotadeviation,
+                              aver_satisfaction,
+                              aver_influencegini,
+                              rules, seed=31415)
 
         print("writing results to", picklefile)
         with open(picklefile, 'wb') as f:
@@ -56,27 +56,12 @@ def start_file_load(dir_name, threshold=None,
     file to consider and the last one.
 
     """
-    file_dir, files = get_file_names(dir_name)
-
     approval_profiles = []
     all_voters = set()
-    if file_dir is not None:
-        # sorts from oldest to newest if name is sortable by date
-        # (YYYYMMDD)
-        files = sorted(files)
-        for f in files:
-            if f.endswith(".tsoi") or f.endswith(".ttoi"):
-                if from_date is not None or to_date is not None:
-                    date = f.split("_")[-1].split(".t")[0]
-                    if from_date is not None and date < from_date:
-                        continue
-                    if to_date is not None and date > to_date:
-                        break
-                candidates, profile = load_file(
-                    os.path.join(file_dir, f), threshold, with_weights)
-                approval_profiles.append(profiles.ApprovalProfile(
-                    list(profile.keys()), candidates, profile))
-                all_voters = all_voters.union(list(profile.keys()))
+    for profile in iter_file_load(dir_name, threshold, from_date, to_date,
+                                  with_weights):
+        approval_profiles.append(profile)
+        all_voters = all_voters.union(profile.voters)
     if only_complete:
         approval_profiles, all_voters = \
             remove_additional_voters(approval_profiles, all_voters)
@@ -85,6 +70,34 @@ def start_file_load(dir_name, threshold=None,
     return approval_profiles, all_voters
 
 
+def iter_file_load(dir_name, threshold=None, from_date=None, to_date=None,
+                   with_weights=False):
+    """
+    Generates the ApprovalProfiles of all tsoi and ttoi files directly
+    within the given directory one by one (oldest first); a file is only
+    read when the next profile is requested.
+
+    The parameters are the same as for start_file_load.
+    """
+    file_dir, files = get_file_names(dir_name)
+    if file_dir is None:
+        return
+    # sorts from oldest to newest if name is sortable by date
+    # (YYYYMMDD)
+    for f in sorted(files):
+        if f.endswith(".tsoi") or f.endswith(".ttoi"):
+            if from_date is not None or to_date is not None:
+                date = f.split("_")[-1].split(".t")[0]
+                if from_date is not None and date < from_date:
+                    continue
+                if to_date is not None and date > to_date:
+                    break
+            candidates, profile = load_file(
+                os.path.join(file_dir, f), threshold, with_weights)
+            yield profiles.ApprovalProfile(list(profile.keys()), candidates,
+                                           profile, validate=False)
+
+
 def load_file(abs_path, threshold, with_weights):
     with open(abs_path, "r") as f:
         lines = f.readlines()
@@ -262,5 +275,6 @@ def remove_additional_voters(approval_profiles, all_voters):
                     cands = cands.union(appr)
             appr_profiles.append(profiles.ApprovalProfile(voter_list,
                                                           list(cands),
-                                                          appr_set))
+                                                          appr_set,
+                                                          validate=False))
     return appr_profiles, voters
@@ -7,18 +7,28 @@
 
 from future.utils import iteritems
 
+import fractions
 try:
+    import gmpy2
     from gmpy2 import mpq as Fraction
 except ImportError:
+    gmpy2 = None
     from fractions import Fraction
 
-import random
 import copy
+import functools
+import heapq
 import math
 import itertools
+import pickle
 import numpy as np
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 rng = np.random.default_rng()
+"""Default random number generator of the random rules."""
 
 PERPETUAL_RULES = ["per_pav",
                    "per_consensus",
@@ -65,14 +75,128 @@ SHORT_RULENAMES = {"per_pav": "Per. PAV",
                    }
 """Dictionary with shortcuts for the rule names."""
 
+NUMERIC_BACKENDS = ["fraction", "mpq", "float"]
+"""Numeric backends for rules with rational weights.
+
+"fraction" uses fractions.Fraction and "mpq" uses gmpy2.mpq. "float"
+computes scores with floating point numbers; if the two best scores are
+within FLOAT_TIE_TOLERANCE the round is scored again with exact
+arithmetic. Weights are always updated exactly, so the float backend
+selects the same winners as exact arithmetic. By default (None), gmpy2.mpq
+is used if available and fractions.Fraction otherwise."""
+
+FLOAT_TIE_TOLERANCE = 1e-9
+"""Relative score difference below which the float backend falls back
+to exact arithmetic."""
+
+
+class PerpetualRule(object):
+    """A perpetual voting rule as stored in the rule registry.
+
+    Parameters
+    ----------
+    name : str
+        The name of the rule.
+
+    step : callable
+        Computes one round: step(profile, weights, **options) returns
+        the winner and updates weights in place.
+
+    weight_layout : str, optional
+        "dict" if the weights are a dictionary voter -> weight,
+        "pair" if they are a pair of such dictionaries
+        (as for per_quota).
+
+    initial_weight : int, optional
+        The initial weight of each voter.
+
+    options : tuple of str, optional
+        The keyword arguments of step that can be set via
+        compute_rule and compute_rule_sequence.
+
+    compact_weights : callable, optional
+        Creates a compact weight object for a list of voters
+        (see init_weights).
+
+    incremental_weights : callable, optional
+        Converts a dictionary of weights into an equivalent weight
+        object that is used by compute_rule_sequence with
+        incremental=True (e.g. CounterWeights.from_weights).
+    """
+
+    def __init__(self, name, step, weight_layout="dict", initial_weight=1,
+                 options=(), compact_weights=None, incremental_weights=None):
+        if weight_layout not in ["dict", "pair"]:
+            raise NotImplementedError("weight layout " + str(weight_layout)
+                                      + " unknown")
+        self.name = name
+        self.step = step
+        self.weight_layout = weight_layout
+        self.initial_weight = initial_weight
+        self.options = tuple(options)
+        self.compact_weights = compact_weights
+        self.incremental_weights = incremental_weights
+
+    def init_weights(self, voters, compact=False):
+        if compact:
+            if self.compact_weights is None:
+                raise NotImplementedError("rule " + str(self.name)
+                                          + " has no compact weights")
+            return self.compact_weights(voters)
+        if self.weight_layout == "pair":
+            return (dict.fromkeys(voters, self.initial_weight),
+                    dict.fromkeys(voters, self.initial_weight))
+        return dict.fromkeys(voters, self.initial_weight)
+
+    def voters(self, weights):
+        """Returns the voters that weights refers to."""
+        if self.weight_layout == "pair":
+            return list(weights[0].keys())
+        return list(weights.keys())
+
+    def bind(self, **options):
+        """Returns step with all options that this rule accepts fixed,
+        i.e., a function (profile, weights) -> winner."""
+        options = {key: value for key, value in iteritems(options)
+                   if key in self.options}
+        if not options:
+            return self.step
+        return functools.partial(self.step, **options)
+
+
+RULE_REGISTRY = {}
+"""Dictionary of all registered rules (name -> PerpetualRule)."""
+
+
+def register_rule(rule):
+    """Adds a PerpetualRule to the registry; it can then be used with
+    compute_rule, compute_rule_sequence and init_weights."""
+    RULE_REGISTRY[rule.name] = rule
+
+
+def get_rule(rule):
+    """Returns the PerpetualRule for a rule name (or the PerpetualRule
+    itself)."""
+    if isinstance(rule, PerpetualRule):
+        return rule
+    try:
+        return RULE_REGISTRY[rule]
+    except KeyError:
+        raise NotImplementedError("rule " + str(rule) + " unknown")
+
 
 def compute_rule_sequence(rule, profile_list, weights=None,
-                          missing_rule=None):
+                          missing_rule=None, vectorized=False, backend=None,
+                          incremental=False, tiebreaking=None, rng=None,
+                          cache_profiles=False):
     """Starting point for computing a perpetual voting rule multiple times.
 
+    The rule is looked up once; the voters are taken from weights once
+    at the start.
+
     Parameters
     ----------
-    rule : str
+    rule : str or PerpetualRule
         The name of the rule that is used.
 
     profile_list : ApprovalProfile list
@@ -84,24 +208,113 @@ def compute_rule_sequence(rule, profile_list, weights=None,
     missing_rule : str, optional
         The rule that is used if a voter is missing from the profile.
 
+    vectorized : bool, optional
+        If True, per_pav, per_unitcost and per_reset are computed with
+        NumPy array operations (see weighted_approval_method).
+
+    backend : str, optional
+        The numeric backend for rules with rational weights
+        (see NUMERIC_BACKENDS).
+
+    incremental : bool, optional
+        If True and the rule has incremental weights (see PerpetualRule,
+        e.g. CounterWeights), dictionary weights are converted into such
+        a weight object for the whole sequence, so that, e.g., scores
+        are only updated between consecutive rounds on the same profile
+        object. The dictionary is updated with the final weights.
+
+    tiebreaking : callable, optional
+        Selects the winner from the list of tied winners
+        (see TIE-BREAKING); by default the first one.
+
+    rng : numpy.random.Generator, optional
+        The random number generator of the random rules
+        (see election_rngs).
+
+    cache_profiles : bool, optional
+        If True, the profiles completed according to missing_rule are
+        cached (see ApprovalProfile.completed).
+
     Returns
     -------
     list
         A list of winners (each input profile one winner)
     """
-    winner_history = []
-    for profile in profile_list:
-        winner_history.append(compute_rule(rule, profile, weights,
-                                           missing_rule))
-    return winner_history
+    return list(iter_rule_sequence(
+        rule, profile_list, weights, missing_rule, vectorized=vectorized,
+        backend=backend, incremental=incremental, tiebreaking=tiebreaking,
+        rng=rng, cache_profiles=cache_profiles))
+
+
+def iter_rule_sequence(rule, profile_iter, weights=None, missing_rule=None,
+                       vectorized=False, backend=None, incremental=False,
+                       tiebreaking=None, rng=None, cache_profiles=False,
+                       with_weights=False):
+    """Computes a perpetual voting rule round by round.
+
+    Works like compute_rule_sequence, but profile_iter can be any iterable
+    (e.g. file_loader.iter_file_load or a generator) and is consumed
+    lazily: each profile is only requested when the next winner is, so
+    only one round has to be held in memory.
+
+    Parameters
+    ----------
+    rule : str or PerpetualRule
+        The name of the rule that is used.
+
+    profile_iter : iterable of ApprovalProfile
+        The approval profiles to use the rule on.
+
+    with_weights : bool, optional
+        If True, (winner, weights) pairs are yielded, where weights are
+        the weights after the round. They are the weights object used by
+        the rule and are updated in place by the next round; copy them
+        to keep them.
+
+    The remaining parameters are the same as for compute_rule_sequence.
+    With incremental, the dictionary is updated with the weights after
+    the last computed round once the iteration ends, i.e. when
+    profile_iter is exhausted, the generator is closed (e.g. by a break
+    out of a for loop or by close()) or an exception is raised.
+
+    Yields
+    ------
+    winner or tuple
+        The winner of each profile (with the weights if with_weights)
+    """
+    rule = get_rule(rule)
+    step = rule.bind(vectorized=vectorized, backend=backend,
+                     tiebreaking=tiebreaking, rng=rng)
+    voters = rule.voters(weights)
+    incremental_weights = None
+    if (incremental and rule.incremental_weights is not None
+            and isinstance(weights, dict)):
+        incremental_weights = rule.incremental_weights(weights)
+    round_weights = weights
+    if incremental_weights is not None:
+        round_weights = incremental_weights
+    try:
+        for profile in profile_iter:
+            profile = _prepare_profile(profile, voters, missing_rule,
+                                       cache_profiles)
+            winner = step(profile, round_weights)
+            if with_weights:
+                yield winner, round_weights
+            else:
+                yield winner
+    finally:
+        if incremental_weights is not None:
+            weights.update(incremental_weights.as_dict())
 
 
-def compute_rule(rule, profile, weights=None, missing_rule=None):
+def compute_rule(rule, profile, weights=None, missing_rule=None,
+                 vectorized=False, backend=None, tiebreaking=None,
+                 rng=None, cache_profiles=False):
     """Starting point for computing a perpetual voting rule one time.
 
     Parameters
     ----------
-    rule : str
+    rule : str or PerpetualRule
         The name of the rule that is used.
 
     profile : ApprovalProfile
@@ -113,148 +326,968 @@ def compute_rule(rule, profile, weights=None, missing_rule=None):
     missing_rule : str, optional
         The rule that is used if a voter is missing from the profile.
 
+    vectorized : bool, optional
+        If True, per_pav, per_unitcost and per_reset are computed with
+        NumPy array operations (see weighted_approval_method).
+
+    backend : str, optional
+        The numeric backend for rules with rational weights
+        (see NUMERIC_BACKENDS).
+
+    tiebreaking : callable, optional
+        Selects the winner from the list of tied winners
+        (see TIE-BREAKING); by default the first one.
+
+    rng : numpy.random.Generator, optional
+        The random number generator of the random rules
+        (see election_rngs).
+
+    cache_profiles : bool, optional
+        If True, the profiles completed according to missing_rule are
+        cached (see ApprovalProfile.completed).
+
     Returns
     -------
     winner
         The winner according to the rule
     """
-    if rule == "per_quota" or rule == "per_quota_min" \
-            or rule == "per_quota_new":
-        voters = weights[0].keys()
-    else:
-        voters = weights.keys()
-    if missing_rule == "empty":
-        profile = copy.deepcopy(profile)
-        for voter in voters:
-            if voter not in profile.voters:
-                profile.voters.append(voter)
-                profile.approval_sets[voter] = []
-    elif missing_rule == "all":
-        profile = copy.deepcopy(profile)
-        for voter in voters:
-            if voter not in profile.voters:
-                profile.voters.append(voter)
-                profile.approval_sets[voter] = list(profile.cands)
+    rule = get_rule(rule)
+    profile = _prepare_profile(profile, rule.voters(weights), missing_rule,
+                               cache_profiles)
+    return rule.bind(vectorized=vectorized, backend=backend,
+                     tiebreaking=tiebreaking, rng=rng)(profile, weights)
+
+
+class PerpetualElection(object):
+    """A running perpetual election.
+
+    The state of the election consists of the rule, the weights and the
+    winners so far (the round counter is len(winners)). Snapshots share
+    the weights with the election until one of them computes another
+    round (copy-on-write); to_bytes and from_bytes serialize the state,
+    e.g., to resume an election in another process.
+
+    Parameters
+    ----------
+    rule : str or PerpetualRule
+        The name of the rule that is used.
+
+    voters : list, optional
+        All voters; the weights are initialized with init_weights.
+
+    weights : tuple or dict, optional
+        The current weights (instead of voters).
+
+    missing_rule : str, optional
+        The rule that is used if a voter is missing from a profile.
+
+    options
+        Options of the rule (see compute_rule), e.g., backend.
+    """
+
+    def __init__(self, rule, voters=None, weights=None, missing_rule=None,
+                 **options):
+        self.rule = get_rule(rule)
+        if weights is None:
+            weights = self.rule.init_weights(voters)
+        self.weights = weights
+        self.voters = self.rule.voters(weights)
+        self.missing_rule = missing_rule
+        self.options = options
+        self.winners = []
+        self._step = self.rule.bind(**options)
+        self._shared = False
+
+    @property
+    def round(self):
+        """The number of rounds computed so far."""
+        return len(self.winners)
+
+    def step(self, profile):
+        """Computes the next round and returns its winner."""
+        if self._shared:
+            self.weights = _copy_weights(self.rule, self.weights)
+            self._shared = False
+        profile = _prepare_profile(profile, self.voters, self.missing_rule)
+        winner = self._step(profile, self.weights)
+        self.winners.append(winner)
+        return winner
+
+    def run(self, profile_list):
+        """Computes one round per profile and returns the winners."""
+        return [self.step(profile) for profile in profile_list]
+
+    def snapshot(self):
+        """Returns a copy of the election; the weights are copied only
+        once the election or the snapshot computes another round."""
+        snapshot = copy.copy(self)
+        snapshot.winners = list(self.winners)
+        snapshot.options = dict(self.options)
+        self._shared = snapshot._shared = True
+        return snapshot
+
+    def restore(self, snapshot):
+        """Resets the election to the state of snapshot."""
+        self.__dict__.update(snapshot.snapshot().__dict__)
+
+    def to_bytes(self):
+        """Serializes the state of the election (the rule is stored by
+        name and its options have to be picklable)."""
+        return pickle.dumps({"rule": self.rule.name,
+                             "weights": self.weights,
+                             "missing_rule": self.missing_rule,
+                             "options": self.options,
+                             "winners": self.winners},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Restores an election serialized with to_bytes."""
+        state = pickle.loads(data)
+        election = cls(state["rule"], weights=state["weights"],
+                       missing_rule=state["missing_rule"],
+                       **state["options"])
+        election.winners = state["winners"]
+        return election
+
+
+def _copy_weights(rule, weights):
+    """Copies weights; weights are immutable numbers, so copying the
+    dictionaries suffices."""
+    if isinstance(weights, dict):
+        return dict(weights)
+    if rule.weight_layout == "pair" and isinstance(weights, tuple):
+        return tuple(_copy_weights(rule, w) for w in weights)
+    return copy.deepcopy(weights)
+
+
+def tied_winners(rule, profile, weights=None, missing_rule=None,
+                 vectorized=False, backend=None):
+    """Returns all candidates that are tied for winning one round.
+
+    The parameters are the same as for compute_rule; weights are not
+    modified. For rules without the option tiebreaking the list contains
+    only the winner.
+
+    Returns
+    -------
+    list
+        The tied winners in the order of profile.cands
+    """
+    rule = get_rule(rule)
+    profile = _prepare_profile(profile, rule.voters(weights), missing_rule)
+    step = rule.bind(vectorized=vectorized, backend=backend)
+    return __tied_step(rule, step, profile, copy.deepcopy(weights))
+
+
+def __tied_step(rule, step, profile, weights):
+    """Computes one round with the first tied winner (modifying weights)
+    and returns the list of tied winners."""
+    if "tiebreaking" not in rule.options:
+        return [step(profile, weights)]
+    tied = []
+
+    def record(tied_winners):
+        tied.extend(tied_winners)
+        return tied_winners[0]
+
+    step(profile, weights, tiebreaking=record)
+    return tied
+
+
+def compute_rule_ties(rule, profile_list, weights=None, missing_rule=None,
+                      vectorized=False, backend=None):
+    """Computes the outcomes of a perpetual voting rule under all
+    possible tie-breakings.
+
+    Branches that lead to the same weights after the same round are
+    merged, so the result is a directed acyclic graph of states rather
+    than a tree of all winner sequences. The parameters are the same as
+    for compute_rule_sequence; weights are not modified.
+
+    Returns
+    -------
+    list
+        One dictionary per round that maps each state before the round
+        to a dictionary tied winner -> state after the round. A state is
+        a tuple of the weights of all voters (see winner_sequences and
+        count_winner_sequences).
+    """
+    rule = get_rule(rule)
+    step = rule.bind(vectorized=vectorized, backend=backend)
+    voters = rule.voters(weights)
+
+    def key(state):
+        if rule.weight_layout == "pair":
+            return (tuple(state[0][v] for v in voters)
+                    + tuple(state[1][v] for v in voters))
+        return tuple(state[v] for v in voters)
+
+    states = {key(weights): copy.deepcopy(weights)}
+    tie_tree = []
+    for profile in profile_list:
+        profile = _prepare_profile(profile, voters, missing_rule)
+        successors = {}
+        next_states = {}
+        for state_key, state in iteritems(states):
+            successors[state_key] = {}
+            new_state = copy.deepcopy(state)
+            tied = __tied_step(rule, step, profile, new_state)
+            for c in tied:
+                if c != tied[0]:
+                    new_state = copy.deepcopy(state)
+                    step(profile, new_state, tiebreaking=lambda _: c)
+                new_key = key(new_state)
+                next_states.setdefault(new_key, new_state)
+                successors[state_key][c] = new_key
+        tie_tree.append(successors)
+        states = next_states
+    return tie_tree
+
+
+def winner_sequences(tie_tree):
+    """Generates all winner sequences of a result of compute_rule_ties."""
+    def sequences(round, state_key):
+        if round == len(tie_tree):
+            yield []
+            return
+        for c, next_key in iteritems(tie_tree[round][state_key]):
+            for sequence in sequences(round + 1, next_key):
+                yield [c] + sequence
+
+    if not tie_tree:
+        yield []
+        return
+    for state_key in tie_tree[0]:
+        for sequence in sequences(0, state_key):
+            yield sequence
+
+
+def count_winner_sequences(tie_tree):
+    """Returns the number of winner sequences of a result of
+    compute_rule_ties (without enumerating them)."""
+    count = None
+    for successors in reversed(tie_tree):
+        count = {state_key: sum(1 if count is None else count[next_key]
+                                for next_key in successors[state_key]
+                                .values())
+                 for state_key in successors}
+    if count is None:
+        return 1
+    return sum(count.values())
+
+
+def _prepare_profile(profile, voters, missing_rule, cache=False):
+    """Deals with voters that are missing in profile according to
+    missing_rule."""
+    if missing_rule == "empty" or missing_rule == "all":
+        profile = profile.completed(voters, missing_rule, cache)
 
     elif missing_rule == "ignore":
         pass
     else:
         for voter in voters:
-            if voter not in profile.voters:
+            if voter not in profile.voter_index:
                 raise Exception("Missing voter")
         if profile.has_empty_sets():
             raise Exception("Voters with empty approval sets")
-
-    if rule == "per_pav":
-        return per_pav(profile, weights)
-    elif rule == "per_consensus":
-        return per_consensus(profile, weights)
-    elif rule == "per_unitcost":
-        return per_unitcost(profile, weights)
-    elif rule == "per_reset":
-        return per_reset(profile, weights)
-    elif rule == "per_nash":
-        return per_nash(profile, weights)
-    elif rule == "per_equality":
-        return per_equality(profile, weights)
-    elif rule == "av":
-        return av(profile)
-    elif rule == "per_jan":
-        return per_jan(profile, weights)
-    elif rule == "per_phragmen":
-        return per_phragmen(profile, weights)
-    elif rule == "per_quota":
-        return per_quota(profile, weights)
-    elif rule == "per_quota_new":
-        return per_quota_new(profile, weights)
-    elif rule == "per_quota_min":
-        return per_quota_min(profile, weights)
-    elif rule == "weighted_random_dictatorship":
-        return weighted_random_dictatorship(profile, weights)
-    elif rule == "random_dictatorship":
-        return random_dictatorship(profile)
-    elif rule == "random_serial_dictatorship":
-        return random_serial_dictatorship(profile)
-    elif rule == "per_majority":
-        return per_majority(profile, weights)
-    elif rule == "per_2nd_prize":
-        return per_2nd_prize(profile, weights)
-    elif rule == "rotating_dictatorship":
-        return rotating_dictatorship(profile, weights)
-    elif rule == "rotating_serial_dictatorship":
-        return rotating_serial_dictatorship(profile, weights)
-    elif rule == "per_minmax_dryspell":
-        return per_minmax_dryspell(profile, weights)
-    else:
-        raise NotImplementedError("rule " + str(rule) + " unknown")
+    return profile
 
 
-def init_weights(rule, voters):
+def init_weights(rule, voters, compact=False):
     """Generates a weight object for the given rule with and all
     the voters
 
     Parameters
     ----------
-    rule : str
+    rule : str or PerpetualRule
         The name of the rule that is used.
 
     voters : list
         A list with all voters.
 
+    compact : bool, optional
+        If True, a compact weight object is returned instead of a
+        dictionary (only for per_pav, per_unitcost and per_reset,
+        see CounterWeights, rotating_dictatorship and
+        rotating_serial_dictatorship, see RotationWeights, and
+        per_minmax_dryspell, see DryspellWeights).
+
     Returns
     -------
     weights
         The initial weights for the rule.
     """
-    if (rule == "per_multiplication_offset" or
-            rule == "per_nash" or
-            rule == "per_equality" or
-            rule == "per_phragmen"):
-        return dict.fromkeys(voters, 0)
-    elif (rule == "per_quota"
-            or rule == "per_quota_min"
-            or rule == "per_quota_new"):
-        return (dict.fromkeys(voters, 0), dict.fromkeys(voters, 0))
+    return get_rule(rule).init_weights(voters, compact)
+
+
+class CounterWeights(Mapping):
+    """Weights of per_pav, per_unitcost or per_reset stored as one
+    integer counter per voter.
+
+    For per_pav the counter is the number of wins of a voter and the
+    weight is 1/(counter+1); for per_unitcost it is the number of losses
+    and for per_reset the number of losses since the last win, in both
+    cases the weight is counter+1. Scores are computed from the counters
+    with integer arithmetic (per_pav weights are scaled by the least
+    common multiple of all denominators).
+
+    If the same profile object is used in consecutive rounds, the
+    candidates' scores are kept and only updated with the changes caused
+    by the voters approving the winner. The counters must therefore not
+    be modified from outside between such rounds.
+
+    The object is a read-only mapping voter -> weight; as_dict returns
+    the weights as a dictionary as used by the other rules.
+    """
+
+    def __init__(self, rule, voters):
+        if rule not in ["per_pav", "per_unitcost", "per_reset"]:
+            raise NotImplementedError("rule " + str(rule)
+                                      + " has no counter weights")
+        self.rule = rule
+        self.voters = list(voters)
+        self.index = {v: i for i, v in enumerate(self.voters)}
+        self.counters = np.zeros(len(self.voters), dtype=np.int64)
+        self._profile = None
+        self._rows = None
+        self._score = None
+        self._support = None
+        # per_pav weights are multiplied by _scale = lcm(1, ..., _scale_upto)
+        self._scale = 1
+        self._scale_upto = 1
+
+    @classmethod
+    def from_weights(cls, rule, weights):
+        """Converts a dictionary of weights into counters; raises a
+        ValueError if a weight does not correspond to a counter."""
+        counter_weights = cls(rule, weights.keys())
+        for i, v in enumerate(counter_weights.voters):
+            if rule == "per_pav":
+                counter = Fraction(1) / weights[v] - 1
+            else:
+                counter = weights[v] - 1
+            if counter < 0 or counter != int(counter):
+                raise ValueError("weight " + str(weights[v]) + " of voter "
+                                 + str(v) + " is not a valid " + rule
+                                 + " weight")
+            counter_weights.counters[i] = int(counter)
+        return counter_weights
+
+    def __getitem__(self, voter):
+        counter = int(self.counters[self.index[voter]])
+        if self.rule == "per_pav":
+            if counter == 0:
+                return 1
+            return Fraction(1, counter + 1)
+        return counter + 1
+
+    def __iter__(self):
+        return iter(self.voters)
+
+    def __len__(self):
+        return len(self.voters)
+
+    def as_dict(self):
+        return {v: self[v] for v in self.voters}
+
+    def __getstate__(self):
+        # the cached scores are not part of the state
+        state = dict(self.__dict__)
+        state.update(_profile=None, _rows=None, _score=None, _support=None)
+        return state
+
+    def _use_profile(self, profile):
+        if profile is not self._profile:
+            # position of each voter of profile in counters
+            self._rows = np.array([self.index[v] for v in profile.voters],
+                                  dtype=np.intp)
+            self._profile = profile
+            self._score = None
+            self._support = None
+
+    def _cover(self, max_counter):
+        """Increases _scale so that the (scaled) per_pav weights of all
+        counters up to max_counter are integers."""
+        if max_counter + 1 <= self._scale_upto:
+            return
+        scale = self._scale
+        for k in range(self._scale_upto + 1, max_counter + 2):
+            scale = scale * k // math.gcd(scale, k)
+        if self._score is not None:
+            if self._is_big(scale):
+                self._score = self._score.astype(object)
+            self._score = self._score * (scale // self._scale)
+        self._scale = scale
+        self._scale_upto = max_counter + 1
+
+    def _is_big(self, scale):
+        # scores of this magnitude require Python integers
+        return scale * len(self.voters) >= 2 ** 62
+
+    def _voter_weights(self, counters):
+        if self.rule == "per_pav":
+            if self._is_big(self._scale):
+                counters = counters.astype(object)
+            return self._scale // (counters + 1)
+        return counters + 1
+
+    def step(self, profile, tiebreaking=None):
+        """Computes one round and returns the winner."""
+        self._use_profile(profile)
+        rows = self._rows
+        incidence = profile.incidence
+        if self._score is None:
+            counters = self.counters[rows]
+            if self.rule == "per_pav":
+                self._cover(int(counters.max(initial=0)))
+            self._score = incidence.T.dot(self._voter_weights(counters))
+
+        if tiebreaking is None:
+            winner_index = int(np.argmax(self._score))
+        else:
+            winner_index = profile.cand_index[tiebreaking(
+                _tied_maxima(profile.cands, self._score))]
+        approves_winner = incidence[:, winner_index]
+        winner_rows = rows[approves_winner]
+        winner_approvals = incidence[approves_winner]
+        counters = self.counters[winner_rows]
+        if self.rule == "per_pav":
+            self._cover(int(counters.max(initial=0)) + 1)
+            delta = winner_approvals.T.dot(
+                self._voter_weights(counters + 1)
+                - self._voter_weights(counters))
+            self.counters[winner_rows] += 1
+        else:
+            if self._support is None:
+                self._support = incidence.sum(axis=0)
+            self.counters[rows[~approves_winner]] += 1
+            if self.rule == "per_unitcost":
+                # all voters not approving the winner gain 1
+                delta = self._support - winner_approvals.sum(axis=0)
+            else:
+                # ... and all voters approving it are reset to 1
+                delta = (self._support
+                         - winner_approvals.T.dot(counters + 1))
+                self.counters[winner_rows] = 0
+        self._score = self._score + delta
+        return profile.cands[winner_index]
+
+
+class RotationWeights(Mapping):
+    """Weights of rotating_dictatorship and rotating_serial_dictatorship
+    stored as a rotation state.
+
+    The voters serve as dictators in sorted order; cursor is the
+    position of the next voter in this order and skipped holds the
+    (earlier) positions of voters that were passed over because their
+    approval set was empty, in increasing order. A voter has weight 0 if
+    they have already served in the current rotation and weight 1
+    otherwise, as with dictionary weights.
+
+    If the same profile object is used in consecutive rounds, skipped
+    voters that are known to approve no candidate in it are not checked
+    again.
+    """
+
+    def __init__(self, voters):
+        self.voters = list(voters)
+        self.order = sorted(self.voters)
+        self.position = {v: i for i, v in enumerate(self.order)}
+        self.cursor = 0
+        self.skipped = []
+        self._skipped_set = set()
+        # skipped[:_checked] approve no candidate in _profile
+        self._profile = None
+        self._checked = 0
+
+    def __getitem__(self, voter):
+        i = self.position[voter]
+        if i >= self.cursor or i in self._skipped_set:
+            return 1
+        return 0
+
+    def __iter__(self):
+        return iter(self.voters)
+
+    def __len__(self):
+        return len(self.voters)
+
+    def as_dict(self):
+        return {v: self[v] for v in self.voters}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_profile=None, _checked=0)
+        return state
+
+    def _next_dictator(self, profile):
+        if profile is not self._profile:
+            self._profile = profile
+            self._checked = 0
+        approval_sets = profile.approval_sets
+        for k in range(self._checked, len(self.skipped)):
+            i = self.skipped[k]
+            if approval_sets.get(self.order[i]):
+                del self.skipped[k]
+                self._skipped_set.discard(i)
+                self._checked = k
+                return self.order[i]
+        self._checked = len(self.skipped)
+        while self.cursor < len(self.order):
+            voter = self.order[self.cursor]
+            if approval_sets.get(voter):
+                self.cursor += 1
+                return voter
+            self.skipped.append(self.cursor)
+            self._skipped_set.add(self.cursor)
+            self._checked += 1
+            self.cursor += 1
+        return None
+
+    def _reset(self):
+        self.cursor = 0
+        self.skipped = []
+        self._skipped_set = set()
+        self._checked = 0
+
+    def _dictator(self, profile):
+        dictator = self._next_dictator(profile)
+        if dictator is None:
+            # all voters have served, start a new rotation
+            self._reset()
+            dictator = self._next_dictator(profile)
+            if dictator is None:
+                raise IndexError("no voter approves a candidate")
+        return dictator
+
+    def step(self, profile):
+        """Computes one round of rotating_dictatorship and returns the
+        winner."""
+        return profile.approval_sets[self._dictator(profile)][0]
+
+    def serial_step(self, profile):
+        """Computes one round of rotating_serial_dictatorship and returns
+        the winner; the voters restrict the candidates in the rotation
+        order, starting with the dictator."""
+        start = self.position[self._dictator(profile)]
+        order = itertools.chain(itertools.islice(self.order, start, None),
+                                itertools.islice(self.order, start))
+        return min(_serial_dictatorship(profile, order))
+
+
+class DryspellWeights(Mapping):
+    """Weights (dry spells) of per_minmax_dryspell stored in buckets.
+
+    The weight of a voter is the stored value plus a global offset;
+    buckets maps each stored value to the set of voters with this value.
+    If a profile contains all voters, increasing the weights of all
+    voters who do not approve the winner is a shift of the offset, and
+    only the winner's supporters move to another bucket.
+    """
+
+    def __init__(self, voters, initial_weight=1):
+        self.voters = list(voters)
+        self.offset = 0
+        self.stored = dict.fromkeys(self.voters, initial_weight)
+        self.buckets = {initial_weight: set(self.voters)} if voters else {}
+        self._profile = None
+        self._covers = False
+
+    @classmethod
+    def from_weights(cls, weights):
+        """Converts a dictionary of dry spells into buckets."""
+        dryspell_weights = cls(weights.keys())
+        dryspell_weights.stored = dict(weights)
+        dryspell_weights.buckets = {}
+        for voter, value in weights.items():
+            dryspell_weights.buckets.setdefault(value, set()).add(voter)
+        return dryspell_weights
+
+    def __getitem__(self, voter):
+        return self.stored[voter] + self.offset
+
+    def __iter__(self):
+        return iter(self.voters)
+
+    def __len__(self):
+        return len(self.voters)
+
+    def as_dict(self):
+        return {v: self[v] for v in self.voters}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_profile=None, _covers=False)
+        return state
+
+    def _move(self, voter, value):
+        bucket = self.buckets[self.stored[voter]]
+        bucket.discard(voter)
+        if not bucket:
+            del self.buckets[self.stored[voter]]
+        self.stored[voter] = value
+        self.buckets.setdefault(value, set()).add(voter)
+
+    def step(self, profile, tiebreaking=None):
+        """Computes one round and returns the winner."""
+        if profile is not self._profile:
+            self._profile = profile
+            self._covers = (len(profile.voter_index) == len(self.stored)
+                            and all(v in profile.voter_index
+                                    for v in self.stored))
+        unsat_rows = [profile.voter_index[v]
+                      for v in self.buckets[max(self.buckets)]
+                      if v in profile.voter_index]
+        score = profile.incidence[unsat_rows].sum(axis=0)
+        winner = _break_tie(_tied_maxima(profile.cands, score),
+                            tiebreaking)
+
+        supporters = profile.supporters(winner)
+        if self._covers:
+            self.offset += 1
+        else:
+            satisfied = set(supporters)
+            for voter in profile.voters:
+                if voter not in satisfied:
+                    self._move(voter, self.stored[voter] + 1)
+        for voter in supporters:
+            self._move(voter, -self.offset)
+        return winner
+
+
+def _lcm_upto(n):
+    """Least common multiple of 1, ..., n."""
+    lcm = 1
+    for k in range(2, n + 1):
+        lcm = lcm * k // math.gcd(lcm, k)
+    return lcm
+
+
+BATCH_RULES = ["av",
+               "per_pav",
+               "per_unitcost",
+               "per_reset",
+               "per_minmax_dryspell"]
+"""List of rules supported by compute_rule_batch."""
+
+
+def compute_rule_batch(rule, approvals):
+    """Computes a perpetual voting rule for many histories at once.
+
+    All histories have to consist of the same number of rounds with the
+    same voters and candidates. The simulations are advanced in lockstep,
+    scores and weight updates are computed with NumPy array operations.
+    Ties are broken in favor of the candidate with the smallest index
+    (as for compute_rule). Scores are computed exactly; for per_pav,
+    voter weights 1/(k+1) are scaled by the least common multiple of
+    1, ..., rounds so that all scores are integers.
+
+    Parameters
+    ----------
+    rule : str
+        The name of the rule that is used (one of BATCH_RULES).
+
+    approvals : numpy.ndarray
+        A boolean array of shape
+        (simulations, rounds, voters, candidates).
+
+    Returns
+    -------
+    numpy.ndarray
+        An integer array of shape (simulations, rounds) containing the
+        (column) indices of the winning candidates.
+    """
+    approvals = np.asarray(approvals, dtype=bool)
+    num_simulations, num_rounds, num_voters, _ = approvals.shape
+    if rule == "per_pav" or rule == "per_minmax_dryspell":
+        # number of wins or length of the current dry spell
+        weights = np.zeros((num_simulations, num_voters), dtype=int)
+    elif rule in BATCH_RULES:
+        weights = np.ones((num_simulations, num_voters), dtype=int)
     else:
-        return dict.fromkeys(voters, 1)
+        raise NotImplementedError("rule " + str(rule)
+                                  + " not available for batches")
+
+    if rule == "per_pav":
+        pav_scale = _lcm_upto(num_rounds)
+        if pav_scale * num_voters >= 2 ** 62:
+            # Python integers avoid an overflow
+            weights = weights.astype(object)
+
+    simulations = np.arange(num_simulations)
+    winners = np.empty((num_simulations, num_rounds), dtype=int)
+    for r in range(num_rounds):
+        if rule == "per_pav":
+            scoring_weights = pav_scale // (weights + 1)
+        elif rule == "per_minmax_dryspell":
+            scoring_weights = (weights == weights.max(
+                axis=1, keepdims=True)).astype(int)
+        else:
+            scoring_weights = weights
+        score = np.matmul(scoring_weights[:, np.newaxis, :],
+                          approvals[:, r])[:, 0, :]
+        winners[:, r] = score.argmax(axis=1)
+        satisfied = approvals[simulations, r, :, winners[:, r]]
+
+        if rule == "per_pav":
+            weights = weights + satisfied
+        elif rule == "per_unitcost":
+            weights = np.where(satisfied, weights, weights + 1)
+        elif rule == "per_reset":
+            weights = np.where(satisfied, 1, weights + 1)
+        elif rule == "per_minmax_dryspell":
+            weights = np.where(satisfied, 0, weights + 1)
+    return winners
+
+
+########################################################################
+# NUMERIC BACKENDS #####################################################
+########################################################################
+
+def __fraction_type(backend):
+    """Returns the type used for exact rational weights."""
+    if backend is None or backend == "float":
+        return Fraction
+    elif backend == "fraction":
+        return fractions.Fraction
+    elif backend == "mpq":
+        if gmpy2 is None:
+            raise ImportError("numeric backend 'mpq' requires gmpy2")
+        return gmpy2.mpq
+    raise NotImplementedError("numeric backend " + str(backend)
+                              + " unknown")
+
+
+def __number_type(exact):
+    if exact:
+        return lambda x: x
+    return float
+
+
+def __select_winners(cands, compute_scores, backend, minimize=False):
+    """Determines the candidates with the best score.
+
+    compute_scores(exact) returns a dictionary candidate -> score; with
+    exact=False it may use floating point numbers. With the float
+    backend the scores are computed with floating point numbers first
+    and computed again exactly only if the two best scores are within
+    FLOAT_TIE_TOLERANCE of each other.
+
+    Returns
+    -------
+    list, dict, bool
+        The best candidates (in the order of cands), the scores and
+        whether the scores are exact.
+    """
+    if backend == "float":
+        score = compute_scores(False)
+        values = sorted(score.values(), reverse=not minimize)
+        if len(values) == 1:
+            return list(cands), score, False
+        if not any(math.isnan(x) for x in values[:2]):
+            gap = abs(values[0] - values[1])
+            if gap > FLOAT_TIE_TOLERANCE * max(1., abs(values[0])):
+                return ([c for c in cands if score[c] == values[0]],
+                        score, False)
+    score = compute_scores(True)
+    if minimize:
+        best = min(score.values())
+    else:
+        best = max(score.values())
+    return [c for c in cands if score[c] == best], score, True
+
+
+########################################################################
+# RANDOMNESS ###########################################################
+########################################################################
+
+def election_rngs(seed, num_elections):
+    """Returns independent random number generators, one per election.
+
+    The generators are derived from seed with numpy.random.SeedSequence,
+    so the random rules (option rng) produce the same results for the
+    same seed, independent of the order or the process in which the
+    elections are computed.
+    """
+    return [np.random.default_rng(seed_sequence) for seed_sequence
+            in np.random.SeedSequence(seed).spawn(num_elections)]
+
+
+def spawn_rngs(generator, num):
+    """Returns num independent random number generators spawned from
+    the numpy.random.SeedSequence of generator.
+
+    Spawning does not draw from generator, and spawning again returns
+    new generators, independent of the previous ones.
+    """
+    bit_generator = generator.bit_generator
+    try:
+        seed_sequence = bit_generator.seed_seq
+    except AttributeError:
+        # numpy < 1.25
+        seed_sequence = bit_generator._seed_seq
+    return [np.random.default_rng(child)
+            for child in seed_sequence.spawn(num)]
+
+
+class AliasSampler(object):
+    """Draws indices with probability proportional to the given
+    (non-negative) values with Vose's alias method: setting up takes
+    linear time, each draw constant time."""
+
+    def __init__(self, values):
+        values = [float(value) for value in values]
+        total = sum(values)
+        if not values or total <= 0:
+            raise ValueError("cannot sample from values " + str(values))
+        num = len(values)
+        scaled = [value * num / total for value in values]
+        self.prob = [1.] * num
+        self.alias = list(range(num))
+        small = [i for i in range(num) if scaled[i] < 1]
+        large = [i for i in range(num) if scaled[i] >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def draw(self, rng):
+        """Returns a random index using the numpy.random.Generator rng."""
+        i = int(rng.integers(len(self.prob)))
+        if rng.random() < self.prob[i]:
+            return i
+        return self.alias[i]
+
+
+def __generator(generator):
+    """Returns generator or, if None, the module's default generator."""
+    if generator is None:
+        return rng
+    return generator
+
+
+def __choice(generator, sequence):
+    return sequence[int(generator.integers(len(sequence)))]
+
+
+########################################################################
+# TIE-BREAKING #########################################################
+########################################################################
+
+# Rules with the option tiebreaking accept a function that receives the
+# list of tied winners (in the order of profile.cands) and returns the
+# winner; by default (None) the first tied winner wins.
+
+def _break_tie(tied_winners, tiebreaking):
+    if tiebreaking is None:
+        return tied_winners[0]
+    return tiebreaking(list(tied_winners))
+
+
+def _tied_maxima(cands, score):
+    """Returns the candidates with maximum score (score is an array in
+    the order of cands)."""
+    return [cands[j] for j in np.flatnonzero(score == score.max())]
 
 
 ########################################################################
 # PERPETUAL VOTING RULES (APPROVAL-BASED) ##############################
 ########################################################################
 
-def per_pav(profile, weights):
-    def winfunc(x):
-        return Fraction(x, x+1)
+def per_pav(profile, weights, vectorized=False, backend=None,
+            tiebreaking=None):
+    if isinstance(weights, CounterWeights):
+        return weights.step(profile, tiebreaking)
+    frac = __fraction_type(backend)
+    if vectorized:
+        counters = __pav_counters(profile, weights)
+        if counters is not None:
+            return __per_pav_counters(profile, weights, counters, frac,
+                                      tiebreaking)
+        # applied to each entry of an array of exact weights
+        winfunc = np.frompyfunc(lambda x: frac(x, x + 1), 1, 1)
+    else:
+        def winfunc(x):
+            return frac(x, x+1)
 
     def losefunc(x):
         return x
 
-    return weighted_approval_method(profile, weights, winfunc, losefunc)
+    return weighted_approval_method(profile, weights, winfunc, losefunc,
+                                    vectorized, backend, tiebreaking)
+
+
+def __pav_counters(profile, weights):
+    """Returns the counters k of per_pav weights 1/(k+1) of the voters of
+    profile as an array; None if a weight is not of this form."""
+    try:
+        ratios = np.array([(weights[v].numerator, weights[v].denominator)
+                           for v in profile.voters], dtype=np.int64)
+    except (AttributeError, OverflowError, TypeError):
+        return None
+    ratios = ratios.reshape(-1, 2)
+    if (ratios[:, 0] != 1).any():
+        return None
+    return ratios[:, 1] - 1
+
+
+def __per_pav_counters(profile, weights, counters, frac, tiebreaking):
+    """per_pav with vectorized=True: the scores are computed with the
+    integer weights lcm(1, ..., max k + 1) / (k + 1) (as in
+    compute_rule_batch) and only the weights of the voters approving the
+    winner are updated."""
+    scale = _lcm_upto(int(counters.max(initial=0)) + 1)
+    if scale * len(counters) >= 2 ** 62:
+        # Python integers avoid an overflow
+        counters = counters.astype(object)
+    score = profile.incidence.T.dot(scale // (counters + 1))
+    if tiebreaking is None:
+        winner_index = int(np.argmax(score))
+    else:
+        winner_index = profile.cand_index[tiebreaking(
+            _tied_maxima(profile.cands, score))]
+    for i in profile.supporter_indices(profile.cands[winner_index]).tolist():
+        weights[profile.voters[i]] = frac(1, int(counters[i]) + 2)
+    return profile.cands[winner_index]
+
 
+def per_consensus(profile, weights, backend=None, tiebreaking=None):
+    return __per_subtraction(profile, weights, subtr_mode="per_consensus",
+                             backend=backend, tiebreaking=tiebreaking)
 
-def per_consensus(profile, weights):
-    return __per_subtraction(profile, weights, subtr_mode="per_consensus")
 
+def per_unitcost(profile, weights, vectorized=False, tiebreaking=None):
+    if isinstance(weights, CounterWeights):
+        return weights.step(profile, tiebreaking)
 
-def per_unitcost(profile, weights):
     def winfunc(x):
         return x
 
     def losefunc(x):
         return x+1
 
-    return weighted_approval_method(profile, weights, winfunc, losefunc)
+    return weighted_approval_method(profile, weights, winfunc, losefunc,
+                                    vectorized, tiebreaking=tiebreaking)
+
 
+def per_reset(profile, weights, vectorized=False, tiebreaking=None):
+    if isinstance(weights, CounterWeights):
+        return weights.step(profile, tiebreaking)
 
-def per_reset(profile, weights):
     def winfunc(_):
         return 1
 
     def losefunc(x):
         return x+1
 
-    return weighted_approval_method(profile, weights, winfunc, losefunc)
+    return weighted_approval_method(profile, weights, winfunc, losefunc,
+                                    vectorized, tiebreaking=tiebreaking)
 
 
 def per_jan(profile, weights):
@@ -278,85 +1311,175 @@ def per_jan(profile, weights):
 #     return __per_subtraction(profile, weights, subtr_mode="numvoters_half")
 
 
-def per_2nd_prize(profile, weights):
-    return __per_subtraction(profile, weights, subtr_mode="per_2nd_prize")
+def per_2nd_prize(profile, weights, backend=None, tiebreaking=None):
+    return __per_subtraction(profile, weights, subtr_mode="per_2nd_prize",
+                             backend=backend, tiebreaking=tiebreaking)
 
 
-def __per_subtraction(profile, weights, subtr_mode="numvoters"):
-    score = {}
-    candidate_support = dict.fromkeys(profile.cands, 0)
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v] and weights[v] > 0:
-                score[c] += weights[v]
-                candidate_support[c] += 1
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc][0]
-    for v in profile.voters:
+def __per_subtraction(profile, weights, subtr_mode="numvoters",
+                      backend=None, tiebreaking=None):
+    # only voters with a positive weight count and pay
+    positive = np.array([weights[v] > 0 for v in profile.voters],
+                        dtype=bool)
+
+    def compute_scores(exact):
+        number = __number_type(exact)
+        weight = {i: number(weights[profile.voters[i]])
+                  for i in np.flatnonzero(positive).tolist()}
+        # approval is membership: each supporter counts once
+        score = {}
+        for c in profile.cands:
+            score[c] = sum((weight[i] for i in
+                            profile.supporter_indices(c).tolist()
+                            if i in weight), 0)
+        return score
+
+    winners, score, _ = __select_winners(profile.cands, compute_scores,
+                                         backend)
+    winner = _break_tie(winners, tiebreaking)
+    payers = [v for v in profile.supporters(winner) if weights[v] > 0]
+    if payers:
+        frac = __fraction_type(backend)
         if subtr_mode == "per_consensus":
-            if winner in profile.approval_sets[v] and weights[v] > 0:
-                weights[v] -= Fraction(len(profile.voters),
-                                       candidate_support[winner])
+            deduction = frac(len(profile.voters), len(payers))
+        elif subtr_mode == "numvoters_half":
+            deduction = frac(len(profile.voters), 2 * len(payers))
         elif subtr_mode == "per_2nd_prize":
-            if len(score) > 1:
-                second_prize = sorted(score.values())[-2]
-            else:
-                second_prize = list(score.values())[0]
+            # the second largest score (equal to score[winner] if tied)
+            second_prize = heapq.nlargest(2, score.values())[-1]
             factor = 1 - 1. * second_prize / score[winner]
-            if winner in profile.approval_sets[v] and weights[v] > 0:
-                weights[v] *= factor
-        elif subtr_mode == "numvoters_half":
-            if winner in profile.approval_sets[v] and weights[v] > 0:
-                weights[v] -= Fraction(len(profile.voters),
-                                       2 * candidate_support[winner])
         else:
             raise NotImplementedError("'" + str(subtr_mode)
                                       + "' is not a known subtraction mode")
+        for v in payers:
+            if subtr_mode == "per_2nd_prize":
+                weights[v] *= factor
+            else:
+                weights[v] -= deduction
     for v in profile.voters:
         weights[v] += 1
 
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
-def weighted_approval_method(profile, weights, winfunc, losefunc):
-    score = {}
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            assert(weights[v] >= 0)
-            if c in profile.approval_sets[v]:
-                score[c] += weights[v]
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc][0]
+def weighted_approval_method(profile, weights, winfunc, losefunc,
+                             vectorized=False, backend=None,
+                             tiebreaking=None):
+    """Approval voting with voter weights that are updated by winfunc
+    (for voters approving the winner) and losefunc (for all others).
+
+    With vectorized=True the scores are computed as the product of the
+    incidence matrix with the weight vector and the weights are updated
+    with masked array operations; winfunc and losefunc then have to
+    accept NumPy arrays. Rational weights are multiplied by the least
+    common multiple of their denominators, so the scores are exact
+    integers and the same winner is selected as without vectorized.
+
+    Otherwise, the scores are computed according to backend (see
+    NUMERIC_BACKENDS).
+
+    Ties are broken by tiebreaking (see TIE-BREAKING).
+    """
+    if vectorized:
+        return __weighted_approval_method_vectorized(profile, weights,
+                                                     winfunc, losefunc,
+                                                     tiebreaking)
+
+    for v in profile.voters:
+        assert(weights[v] >= 0)
+
+    def compute_scores(exact):
+        number = __number_type(exact)
+        score = {}
+        for c in profile.cands:
+            score[c] = 0
+            for v in profile.supporters(c):
+                score[c] += number(weights[v])
+        return score
+
+    winner = _break_tie(
+        __select_winners(profile.cands, compute_scores, backend)[0],
+        tiebreaking)
+    supporters = set(profile.supporters(winner))
     for v in profile.voters:
-        if winner in profile.approval_sets[v]:
+        if v in supporters:
             weights[v] = winfunc(weights[v])
         else:
             weights[v] = losefunc(weights[v])
 
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
-def per_majority(profile, weights):
-    score = {}
-    candidate_support = dict.fromkeys(profile.cands, 0)
-    requ_add_budg = dict.fromkeys(profile.cands, len(profile.voters))
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] += weights[v]
-                candidate_support[c] += 1
-        requ_add_budg[c] = Fraction(len(profile.voters) - score[c], candidate_support[c])
-    least_requ_add_budg = min(requ_add_budg.values())
+def __weighted_approval_method_vectorized(profile, weights,
+                                          winfunc, losefunc,
+                                          tiebreaking=None):
+    weightvec = np.array([weights[v] for v in profile.voters])
+    assert (weightvec >= 0).all()
+    score = profile.incidence.T.dot(__integer_weights(weightvec))
+    if tiebreaking is None:
+        winner_index = int(np.argmax(score))
+    else:
+        winner_index = profile.cand_index[tiebreaking(
+            _tied_maxima(profile.cands, score))]
+    winner = profile.cands[winner_index]
+    approves_winner = profile.incidence[:, winner_index]
+    weightvec = np.where(approves_winner,
+                         winfunc(weightvec), losefunc(weightvec))
+    for v, w in zip(profile.voters, weightvec.tolist()):
+        weights[v] = w
+    return winner
+
+
+def __integer_weights(weightvec):
+    """Returns weightvec, scaled to integers if it contains rational
+    numbers (an array of dtype object)."""
+    if weightvec.dtype != object:
+        return weightvec
+    scale = 1
+    for weight in weightvec.tolist():
+        scale = scale * weight.denominator // math.gcd(scale,
+                                                       weight.denominator)
+    scaled = [int(weight * scale) for weight in weightvec.tolist()]
+    if max(scaled, default=0) * len(scaled) >= 2 ** 62:
+        # Python integers avoid an overflow
+        return np.array(scaled, dtype=object)
+    return np.array(scaled, dtype=np.int64)
+
+
+def per_majority(profile, weights, backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
+    candidate_support = profile.cand_support()
+
+    def compute_scores(exact):
+        number = __number_type(exact)
+        requ_add_budg = {}
+        for c in profile.cands:
+            score = 0
+            for v in profile.supporters(c):
+                score += number(weights[v])
+            if exact:
+                requ_add_budg[c] = frac(len(profile.voters) - score,
+                                        candidate_support[c])
+            else:
+                requ_add_budg[c] = ((len(profile.voters) - score)
+                                    / candidate_support[c])
+        return requ_add_budg
+
+    winners, requ_add_budg, exact = __select_winners(
+        profile.cands, compute_scores, backend, minimize=True)
+    winner = _break_tie(winners, tiebreaking)
+    if exact:
+        least_requ_add_budg = requ_add_budg[winner]
+    else:
+        least_requ_add_budg = frac(
+            len(profile.voters)
+            - sum(weights[v] for v in profile.supporters(winner)),
+            candidate_support[winner])
     print("lrab", least_requ_add_budg)
-    winner = [c for c in profile.cands if requ_add_budg[c] == least_requ_add_budg][0]
 
+    supporters = set(profile.supporters(winner))
     for v in profile.voters:
-        if winner in profile.approval_sets[v]:
+        if v in supporters:
             weights[v] = 0
         else:
             weights[v] += least_requ_add_budg
@@ -364,248 +1487,303 @@ def per_majority(profile, weights):
     return winner
 
 
-def per_nash(profile, weights):
-    score = {}
-    for c in profile.cands:
-        score[c] = 1
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] *= weights[v] + 1
-            else:
+def per_nash(profile, weights, backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
+
+    def compute_scores(exact):
+        if not exact:
+            return log_scores()
+        # each voter contributes weight + 1 if approving c and weight
+        # (or epsilon = 1 / 2**len(profile.voters) if the weight is 0)
+        # otherwise; all scores are divided by the (positive) product
+        # of the latter over all voters, so only supporters of c matter
+        score = {}
+        for c in profile.cands:
+            approved = 1
+            replaced = 1
+            for v in profile.supporters(c):
+                approved *= weights[v] + 1
                 if weights[v] == 0:
-                    # multiply by a small epsilon
-                    score[c] *= Fraction(1, 2**len(profile.voters))
+                    approved *= 2**len(profile.voters)
                 else:
-                    score[c] *= weights[v]
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc][0]
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            weights[v] += 1
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
+                    replaced *= weights[v]
+            score[c] = frac(approved, replaced)
+        return score
+
+    def log_scores():
+        # logarithms of the scores; each epsilon factor adds
+        # log(epsilon) = -len(profile.voters) * log(2)
+        weight = np.array([float(weights[v]) for v in profile.voters])
+        approved = np.log1p(weight)
+        not_approved = np.where(weight > 0,
+                                np.log(np.where(weight > 0, weight, 1.)),
+                                -len(profile.voters) * math.log(2))
+        score = (not_approved.sum()
+                 + profile.incidence.T.dot(approved - not_approved))
+        return dict(zip(profile.cands, score.tolist()))
+
+    winner = _break_tie(
+        __select_winners(profile.cands, compute_scores, backend)[0],
+        tiebreaking)
+    for v in profile.supporters(winner):
+        weights[v] += 1
     return winner
 
 
-def per_equality(profile, weights):
-    score = {}
-    minweight = min(weights.values())
-    maxweight = max(weights.values())
-    possible_winners = list(profile.cands)
-    for bound in range(minweight, maxweight + 1):
-        for c in profile.cands:
-            score[c] = 0
-            for v in profile.voters:
-                if c in profile.approval_sets[v] and weights[v] <= bound:
-                    score[c] += 1
-        maxsc = max([score[c] for c in possible_winners])
-        possible_winners = [c for c in possible_winners if score[c] == maxsc]
+def __level_counts(profile, weights):
+    """Groups the voters of profile by weight.
+
+    Returns the sorted distinct weights (levels) and an integer array
+    whose entry [i, j] is the number of voters with weight levels[i]
+    approving the j-th candidate.
+    """
+    levels = sorted(set(weights[v] for v in profile.voters))
+    level_index = {weight: i for i, weight in enumerate(levels)}
+    voter_levels = np.array([level_index[weights[v]]
+                             for v in profile.voters], dtype=np.intp)
+    indptr, indices = profile.supporter_index()
+    cand_positions = np.repeat(np.arange(len(profile.cands)),
+                               np.diff(indptr))
+    counts = np.bincount(
+        voter_levels[indices] * len(profile.cands) + cand_positions,
+        minlength=len(levels) * len(profile.cands))
+    return levels, counts.reshape(len(levels), len(profile.cands))
+
+
+def per_equality(profile, weights, tiebreaking=None):
+    # Candidates are compared by their number of supporters with weight
+    # at most bound for increasing bounds; only bounds that are weights
+    # of voters can change these numbers.
+    levels, counts = __level_counts(profile, weights)
+    cumulative = np.cumsum(counts, axis=0)
+    possible_winners = np.arange(len(profile.cands))
+    for score in cumulative:
+        score = score[possible_winners]
+        possible_winners = possible_winners[score == score.max()]
         if len(possible_winners) == 1:
             break
-    winner = possible_winners[0]
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            weights[v] += 1
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
-    return winner
-
-
-def av(profile):
-    score = {}
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] += 1
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc][0]
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
+    winner = _break_tie([profile.cands[j] for j in possible_winners],
+                        tiebreaking)
+    for v in profile.supporters(winner):
+        weights[v] += 1
     return winner
 
 
-def per_phragmen(profile, weights):
-    averageload = {}
-    for c in profile.cands:
-        supporters = [v for v in profile.voters
-                      if c in profile.approval_sets[v]]
-        if len(supporters) == 0:
-            averageload[c] = float('inf')
-        else:
-            while True:
-                averageload[c] = Fraction(
-                    1 + sum([weights[v] for v in supporters]),
-                    len(supporters))
-                if averageload[c] >= max([weights[v] for v in supporters]):
-                    break
-                else:
-                    supporters = [v for v in profile.voters
-                                  if c in profile.approval_sets[v]
-                                  and weights[v] <= averageload[c]]
-    minload = min(averageload.values())
-    winner = [c for c in profile.cands if averageload[c] == minload][0]
-    for v in profile.voters:
-        if winner in profile.approval_sets[v] and weights[v] < minload:
+def av(profile, tiebreaking=None):
+    score = np.diff(profile.supporter_index()[0])
+    if tiebreaking is not None:
+        return tiebreaking(_tied_maxima(profile.cands, score))
+    # argmax returns the first maximum, i.e., ties are broken
+    # in the order of profile.cands
+    return profile.cands[int(np.argmax(score))]
+
+
+def per_phragmen(profile, weights, backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
+
+    # all supporters of a winner get the same load, so there are
+    # few distinct loads (levels)
+    levels, level_counts = __level_counts(profile, weights)
+
+    def load(c, exact):
+        # water-filling: raise the loads of the least loaded supporters
+        # until the new load (1 + their loads) / their number is reached
+        number = __number_type(exact)
+        counts = level_counts[:, profile.cand_index[c]]
+        total = 1
+        supporters = 0
+        for i in np.flatnonzero(counts):
+            level = number(levels[i])
+            if supporters > 0 and total < supporters * level:
+                break
+            total += int(counts[i]) * level
+            supporters += int(counts[i])
+        if supporters == 0:
+            return float('inf')
+        if exact:
+            return frac(total, supporters)
+        return total / supporters
+
+    def compute_scores(exact):
+        return {c: load(c, exact) for c in profile.cands}
+
+    winners, averageload, exact = __select_winners(
+        profile.cands, compute_scores, backend, minimize=True)
+    winner = _break_tie(winners, tiebreaking)
+    if exact:
+        minload = averageload[winner]
+    else:
+        minload = load(winner, True)
+    for v in profile.supporters(winner):
+        if weights[v] < minload:
             weights[v] = minload
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
 # keep the perpetual-lower quota as small as possible
-def per_quota_min(profile, weights, supportbasedtiebreaking=False):
+def per_quota_min(profile, weights, supportbasedtiebreaking=False,
+                  backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
     per_quota, satisfaction = weights
 
-    cand_support = {c: 0 for c in profile.cands}
-    for voter in profile.voters:
-        for c in profile.approval_sets[voter]:
-            cand_support[c] += 1
-
+    support = profile.voter_support()
     for v in profile.voters:
-        support = max([cand_support[c]
-                       for c in profile.approval_sets[v]] + [0])
-        per_quota[v] += Fraction(support, len(profile.voters))
-
-    score = {}
-    candidate_support = dict.fromkeys(profile.cands, 0)
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] += min(1, max(0, per_quota[v] - satisfaction[v]))
-                candidate_support[c] += 1
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc]
+        per_quota[v] += frac(support[v], len(profile.voters))
+
+    candidate_support = profile.cand_support()
+
+    def compute_scores(exact):
+        number = __number_type(exact)
+        score = {}
+        for c in profile.cands:
+            score[c] = 0
+            for v in profile.supporters(c):
+                score[c] += min(1, max(0, number(per_quota[v])
+                                       - satisfaction[v]))
+        return score
+
+    winner = __select_winners(profile.cands, compute_scores, backend)[0]
     if supportbasedtiebreaking:
-        winner = sorted(winner, reverse=True,
-                        key=lambda c: candidate_support[c])[0]
-    else:
-        winner = winner[0]
+        max_support = max(candidate_support[c] for c in winner)
+        winner = [c for c in winner if candidate_support[c] == max_support]
+    winner = _break_tie(winner, tiebreaking)
 
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            satisfaction[v] += 1
+    for v in profile.supporters(winner):
+        satisfaction[v] += 1
 
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
 # original implementation: with special tie-breaking and
 # violations > 1 count more
-def per_quota(profile, weights, supportbasedtiebreaking=False):
+def per_quota(profile, weights, supportbasedtiebreaking=False,
+              backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
     per_quota, satisfaction = weights
 
-    cand_support = {c: 0 for c in profile.cands}
-    for voter in profile.voters:
-        for c in profile.approval_sets[voter]:
-            cand_support[c] += 1
-
+    support = profile.voter_support()
     for v in profile.voters:
-        support = max([cand_support[c]
-                       for c in profile.approval_sets[v]] + [0])
-        per_quota[v] += Fraction(support, len(profile.voters))
-
-    score = {}
-    candidate_support = dict.fromkeys(profile.cands, 0)
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] += max(0, per_quota[v] - satisfaction[v])
-                candidate_support[c] += 1
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc]
+        per_quota[v] += frac(support[v], len(profile.voters))
+
+    candidate_support = profile.cand_support()
+
+    def compute_scores(exact):
+        number = __number_type(exact)
+        score = {}
+        for c in profile.cands:
+            score[c] = 0
+            for v in profile.supporters(c):
+                score[c] += max(0, number(per_quota[v]) - satisfaction[v])
+        return score
+
+    winner = __select_winners(profile.cands, compute_scores, backend)[0]
     if supportbasedtiebreaking:
-        winner = sorted(winner, reverse=True,
-                        key=lambda c: candidate_support[c])[0]
-    else:
-        winner = winner[0]
+        max_support = max(candidate_support[c] for c in winner)
+        winner = [c for c in winner if candidate_support[c] == max_support]
+    winner = _break_tie(winner, tiebreaking)
 
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            satisfaction[v] += 1
+    for v in profile.supporters(winner):
+        satisfaction[v] += 1
 
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
+def _fractional_gap(values):
+    """Returns the smallest positive difference between the fractional
+    parts (as floats) of values; None if there is none."""
+    # the smallest positive difference between two fractional parts is
+    # the difference of two neighbours in sorted order
+    fractional_parts = sorted(set(math.modf(x)[0] for x in values))
+    diffs = [b - a for a, b in zip(fractional_parts, fractional_parts[1:])]
+    if not diffs:
+        return None
+    return min(diffs)
+
+
 # modification of Perpetual Quota
 # based on qu_k - sat_k
-def per_quota_new(profile, weights):
+def per_quota_new(profile, weights, backend=None, tiebreaking=None):
+    frac = __fraction_type(backend)
     per_quota, satisfaction = weights
-    support = {}
-    cand_support = {c: 0 for c in profile.cands}
-    for voter in profile.voters:
-        for c in profile.approval_sets[voter]:
-            cand_support[c] += 1
-
-    for v in profile.voters:
-        support[v] = max([cand_support[c]
-                          for c in profile.approval_sets[v]] + [0])
+    support = profile.voter_support()
 
-    diffs = [abs(math.modf(per_quota[v])[0] - math.modf(per_quota[w])[0])
-             for v, w in itertools.combinations(profile.voters, 2)]
-    diffs = [d for d in diffs if d > 0]
-    if not diffs:
-        epsilon = Fraction(1, len(profile.voters))
+    gap = _fractional_gap(per_quota[v] for v in profile.voters)
+    if gap is None:
+        epsilon = frac(1, len(profile.voters))
     else:
-        epsilon = min(diffs) / len(profile.voters)
-
-    score = {}
-    for c in profile.cands:
-        score[c] = 0
-        for v in profile.voters:
-            if c in profile.approval_sets[v]:
-                score[c] += max(epsilon, per_quota[v] - satisfaction[v])
-    maxsc = max(score.values())
-    winner = [c for c in profile.cands if score[c] == maxsc]
-    winner = winner[0]
+        epsilon = gap / len(profile.voters)
 
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            satisfaction[v] += 1
+    def compute_scores(exact):
+        number = __number_type(exact)
+        score = {}
+        for c in profile.cands:
+            score[c] = 0
+            for v in profile.supporters(c):
+                score[c] += max(number(epsilon),
+                                number(per_quota[v]) - satisfaction[v])
+        return score
 
-        per_quota[v] += Fraction(support[v], len(profile.voters))
+    winner = _break_tie(
+        __select_winners(profile.cands, compute_scores, backend)[0],
+        tiebreaking)
+
+    for v in profile.supporters(winner):
+        satisfaction[v] += 1
+    for v in profile.voters:
+        per_quota[v] += frac(support[v], len(profile.voters))
 
-    # tied_winners = [c for c in profiles.cands if score[c] == maxsc]
     return winner
 
 
-def random_dictatorship(profile):
+def random_dictatorship(profile, rng=None):
+    rng = __generator(rng)
     voters = [v for (v, appr) in iteritems(profile.approval_sets)
               if len(appr) > 0]
-    dictator = random.choice(voters)
-    return random.choice(profile.approval_sets[dictator])
+    dictator = voters[rng.integers(len(voters))]
+    return __choice(rng, profile.approval_sets[dictator])
 
 
-def weighted_random_dictatorship(profile, weights):
+def weighted_random_dictatorship(profile, weights, rng=None):
+    rng = __generator(rng)
     voters = [v for (v, appr) in iteritems(profile.approval_sets)
               if len(appr) > 0]
-    norm_weights = [weights[v] for v in voters]
-    norm_weights = [w / sum(norm_weights) for w in norm_weights]
-    rand_selection = rng.multinomial(1, norm_weights)
-    rand_selection = [index for index, val in enumerate(rand_selection) if val > 0][0]
-    dictator = voters[rand_selection]
+    sampler = AliasSampler([weights[v] for v in voters])
+    dictator = voters[sampler.draw(rng)]
 
-    winner = random.choice(profile.approval_sets[dictator])
+    winner = __choice(rng, profile.approval_sets[dictator])
 
-    for v in profile.voters:
-        if winner in profile.approval_sets[v]:
-            weights[v] = weights[v] / (weights[v] + 1)
-        else:
-            pass
+    for v in profile.supporters(winner):
+        weights[v] = weights[v] / (weights[v] + 1)
 
     return winner
 
 
-def random_serial_dictatorship(profile):
-    cands = set(profile.cands)
-    voters = list(profile.voters)
-    random.shuffle(voters)
+def random_serial_dictatorship(profile, rng=None):
+    rng = __generator(rng)
+    voters = [profile.voters[i] for i in rng.permutation(len(profile.voters))]
+    return __choice(rng, _serial_dictatorship(profile, voters))
+
+
+def _serial_dictatorship(profile, voters):
+    """Each voter in turn restricts the remaining candidates to those
+    approved by the voter (unless none would remain); returns the
+    remaining candidates in the order of profile.cands. Voters that are
+    not in the profile are skipped."""
+    bitmasks = profile.approval_bitmasks()
+    cands = (1 << len(profile.cands)) - 1
     for v in voters:
-        if cands & set(profile.approval_sets[v]):
-            cands = cands & set(profile.approval_sets[v])
-    return random.choice(list(cands))
+        if not cands & (cands - 1):
+            # a single candidate remains
+            break
+        remaining = cands & bitmasks.get(v, 0)
+        if remaining:
+            cands = remaining
+    return profile.bitmask_cands(cands)
 
 
 def rotating_dictatorship(profile, weights):
+    if isinstance(weights, RotationWeights):
+        return weights.step(profile)
     voters = [v for (v, appr) in iteritems(profile.approval_sets)
               if len(appr) > 0]
     possible_dictators = []
@@ -623,34 +1801,26 @@ def rotating_dictatorship(profile, weights):
 
 
 def rotating_serial_dictatorship(profile, weights):
-    voters = [v for (v, appr) in iteritems(profile.approval_sets)
-              if len(appr) > 0]
-    voters = sorted(voters)
-    possible_dictators = []
-    cands = set(profile.cands)
-    for voter, weight in iteritems(weights):
-        if weight == 1 and voter in voters:
-            possible_dictators.append(voter)
-    if len(possible_dictators) > 0:
-        dictator = sorted(possible_dictators)[0]
-        weights[dictator] = 0
-        for v in (voters[voters.index(dictator):] +
-                  voters[:voters.index(dictator)]):
-            if cands & set(profile.approval_sets[v]):
-                cands = cands & set(profile.approval_sets[v])
-        return sorted(list(cands))[0]
-    else:
-        dictator = voters[0]
+    if isinstance(weights, RotationWeights):
+        return weights.serial_step(profile)
+    voters = sorted(v for (v, appr) in iteritems(profile.approval_sets)
+                    if len(appr) > 0)
+    # the dictator is the first voter (in sorted order) with weight 1
+    pointer = next((i for i, voter in enumerate(voters)
+                    if weights.get(voter) == 1), None)
+    if pointer is None:
+        pointer = 0
         for voter in weights:
             weights[voter] = 1
-        weights[dictator] = 0
-        for v in voters:
-            if cands & set(profile.approval_sets[v]):
-                cands = cands & set(profile.approval_sets[v])
-        return sorted(list(cands))[0]
+    weights[voters[pointer]] = 0
+    order = itertools.chain(itertools.islice(voters, pointer, None),
+                            itertools.islice(voters, pointer))
+    return min(_serial_dictatorship(profile, order))
 
 
-def per_minmax_dryspell(profile, weights):
+def per_minmax_dryspell(profile, weights, tiebreaking=None):
+    if isinstance(weights, DryspellWeights):
+        return weights.step(profile, tiebreaking)
     max_weight = max(weights.values())
     score = {c: 0 for c in profile.cands}
     unsat_voters = [v for v in profile.voters
@@ -661,10 +1831,84 @@ def per_minmax_dryspell(profile, weights):
             score[c] += 1
 
     max_score = max(score.values())
-    winner = [c for c in profile.cands if score[c] == max_score][0]
+    winner = _break_tie([c for c in profile.cands
+                         if score[c] == max_score], tiebreaking)
+    supporters = set(profile.supporters(winner))
     for voter in profile.voters:
-        if winner in profile.approval_sets[voter]:
+        if voter in supporters:
             weights[voter] = 0
         else:
             weights[voter] += 1
     return winner
+
+
+########################################################################
+# RULE REGISTRY ########################################################
+########################################################################
+
+def __ignore_weights(rule):
+    def step(profile, _, **options):
+        return rule(profile, **options)
+    return step
+
+
+register_rule(PerpetualRule("per_pav", per_pav,
+                            options=["vectorized", "backend",
+                                     "tiebreaking"],
+                            compact_weights=functools.partial(
+                                CounterWeights, "per_pav"),
+                            incremental_weights=functools.partial(
+                                CounterWeights.from_weights, "per_pav")))
+register_rule(PerpetualRule("per_consensus", per_consensus,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_majority", per_majority,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_unitcost", per_unitcost,
+                            options=["vectorized", "tiebreaking"],
+                            compact_weights=functools.partial(
+                                CounterWeights, "per_unitcost"),
+                            incremental_weights=functools.partial(
+                                CounterWeights.from_weights, "per_unitcost")))
+register_rule(PerpetualRule("per_reset", per_reset,
+                            options=["vectorized", "tiebreaking"],
+                            compact_weights=functools.partial(
+                                CounterWeights, "per_reset"),
+                            incremental_weights=functools.partial(
+                                CounterWeights.from_weights, "per_reset")))
+register_rule(PerpetualRule("per_nash", per_nash, initial_weight=0,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_equality", per_equality, initial_weight=0,
+                            options=["tiebreaking"]))
+register_rule(PerpetualRule("av", __ignore_weights(av),
+                            options=["tiebreaking"]))
+register_rule(PerpetualRule("per_jan", per_jan))
+register_rule(PerpetualRule("per_phragmen", per_phragmen, initial_weight=0,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_quota", per_quota, weight_layout="pair",
+                            initial_weight=0,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_quota_new", per_quota_new,
+                            weight_layout="pair", initial_weight=0,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("per_quota_min", per_quota_min,
+                            weight_layout="pair", initial_weight=0,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("random_serial_dictatorship",
+                            __ignore_weights(random_serial_dictatorship),
+                            options=["rng"]))
+register_rule(PerpetualRule("weighted_random_dictatorship",
+                            weighted_random_dictatorship, options=["rng"]))
+register_rule(PerpetualRule("random_dictatorship",
+                            __ignore_weights(random_dictatorship),
+                            options=["rng"]))
+register_rule(PerpetualRule("per_2nd_prize", per_2nd_prize,
+                            options=["backend", "tiebreaking"]))
+register_rule(PerpetualRule("rotating_dictatorship", rotating_dictatorship,
+                            compact_weights=RotationWeights))
+register_rule(PerpetualRule("rotating_serial_dictatorship",
+                            rotating_serial_dictatorship,
+                            compact_weights=RotationWeights))
+register_rule(PerpetualRule("per_minmax_dryspell", per_minmax_dryspell,
+                            options=["tiebreaking"],
+                            compact_weights=DryspellWeights,
+                            incremental_weights=DryspellWeights.from_weights))
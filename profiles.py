@@ -3,17 +3,197 @@
 # Author: Martin Lackner
 
 import copy
+import weakref
+import numpy as np
 import numpy.random as random
 from scipy.spatial.distance import euclidean
 from future.utils import iteritems
-import collections
+from collections import ChainMap, OrderedDict
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+class BaseApprovalProfile(object):
+    """The methods shared by all approval profiles.
+
+    Subclasses provide voters, cands, approval_sets, voter_index,
+    cand_index and the dictionary _cache of derived quantities. The
+    class has no instance dictionary, so subclasses with __slots__ (such
+    as CompactApprovalProfile) have none either.
+    """
+    __slots__ = ()
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def incidence(self):
+        """The voter x candidate incidence matrix.
+
+        Row i corresponds to voter self.voters[i], column j to candidate
+        self.cands[j]; entry (i, j) is True if voter i approves
+        candidate j. The dense matrix is only built (and cached) when
+        needed; quantities such as the supports are derived from the
+        supporter index instead.
+        """
+        def compute():
+            rows, columns = self._approvals()
+            incidence = np.zeros((len(self.voters), len(self.cands)),
+                                 dtype=bool)
+            incidence[rows, columns] = True
+            return incidence
+        return self._cached("incidence", compute)
+
+    def cand_support(self):
+        """Returns a dictionary candidate -> number of approving voters.
+
+        Derived quantities such as this one are computed once and cached;
+        the returned objects are shared and must not be modified (see
+        invalidate_cache).
+        """
+        def compute():
+            support = np.diff(self.supporter_index()[0])
+            return dict(zip(self.cands, support.tolist()))
+        return self._cached("cand_support", compute)
+
+    def voter_support(self):
+        """Returns a dictionary voter -> largest support (number of
+        approving voters) of a candidate approved by the voter; 0 if the
+        voter approves no candidate."""
+        def compute():
+            indptr, indices = self.supporter_index()
+            support = np.diff(indptr)
+            max_support = np.zeros(len(self.voters), dtype=support.dtype)
+            np.maximum.at(max_support, indices, np.repeat(support, support))
+            return dict(zip(self.voters, max_support.tolist()))
+        return self._cached("voter_support", compute)
+
+    def approval_bitmasks(self):
+        """Returns a dictionary voter -> approval set as an integer
+        bitmask; bit j is set if the voter approves self.cands[j]."""
+        def compute():
+            return {v: int.from_bytes(row.tobytes(), "little")
+                    for v, row in zip(self.voters, self.packed_incidence())}
+        return self._cached("approval_bitmasks", compute)
+
+    def bitmask_cands(self, bitmask):
+        """Returns the candidates in bitmask (in the order of
+        self.cands)."""
+        cands = []
+        while bitmask:
+            lowest = bitmask & -bitmask
+            cands.append(self.cands[lowest.bit_length() - 1])
+            bitmask ^= lowest
+        return cands
+
+    def supporter_index(self):
+        """Returns the inverted index of the approvals: the voters
+        approving the j-th candidate have the positions (in self.voters)
+        indices[indptr[j]:indptr[j+1]] (in increasing order).
+
+        It is built from the approval sets by sorting the approvals
+        (which also removes duplicates), i.e., in O(A log A) time for A
+        approvals, and returned as the pair (indptr, indices).
+        """
+        def compute():
+            rows, columns = self._approvals()
+            num_voters = max(len(self.voters), 1)
+            # sorting by candidate, then voter also removes duplicates
+            keys = np.unique(columns * num_voters + rows)
+            counts = np.bincount(keys // num_voters,
+                                 minlength=len(self.cands))
+            indptr = np.concatenate(([0], np.cumsum(counts)))
+            return indptr, keys % num_voters
+        return self._cached("supporter_index", compute)
+
+    def _approvals(self):
+        """Returns the voter and candidate positions of all approvals as
+        two arrays."""
+        rows = []
+        columns = []
+        for i, v in enumerate(self.voters):
+            appr = self.approval_sets.get(v, ())
+            rows.extend([i] * len(appr))
+            columns.extend(self.cand_index[c] for c in appr)
+        return (np.array(rows, dtype=np.int64),
+                np.array(columns, dtype=np.int64))
+
+    def supporter_indices(self, cand):
+        """Returns the positions (in self.voters) of the voters approving
+        cand as an array (see supporter_index)."""
+        indptr, indices = self.supporter_index()
+        j = self.cand_index[cand]
+        return indices[indptr[j]:indptr[j + 1]]
+
+    def supporters(self, cand):
+        """Returns the list of voters approving cand (in the order of
+        self.voters)."""
+        supporters = self._cached("supporters", dict)
+        if cand not in supporters:
+            supporters[cand] = [self.voters[i] for i in
+                                self.supporter_indices(cand).tolist()]
+        return supporters[cand]
+
+    def __str__(self):
+        return ("Profile with %d votes and %d candidates: "
+                % (len(self.voters), len(self.cands))
+                + ', '.join(map(str, self.approval_sets.values())))
+
+    def packed_incidence(self):
+        """Returns the incidence matrix with each row packed into bits;
+        bit j (counting from the least significant bit of the first
+        byte) belongs to self.cands[j] as in approval_bitmasks (see
+        numpy.packbits)."""
+        return np.packbits(self.incidence, axis=1, bitorder="little")
+
+    def completed(self, voters, missing_rule, cache=False):
+        """Returns this profile with the voters in voters that are
+        missing added (see CompletedProfile); the profile itself if no
+        voter is missing.
+
+        If cache is True, the result is cached for this list of voters
+        and missing_rule.
+        """
+        def compute():
+            missing = [v for v in voters if v not in self.voter_index]
+            if not missing:
+                return self
+            return CompletedProfile(self, missing, missing_rule)
+        if not cache:
+            return compute()
+        return self._cached(("completed", missing_rule, tuple(voters)),
+                            compute)
+
+    def has_empty_sets(self):
+        for appr in self.approval_sets.values():
+            if len(appr) == 0:
+                return True
+        return False
+
+    def compact(self):
+        """Returns the profile as a CompactApprovalProfile."""
+        return CompactApprovalProfile(self.voters, self.cands,
+                                      self.approval_sets, validate=False)
 
 
 # approval profile
-class ApprovalProfile(object):
-    def __init__(self, voters, cands, approval_sets):
+class ApprovalProfile(BaseApprovalProfile):
+    """An approval profile: the approval sets of voters over cands.
+
+    approval_sets is a dictionary voter -> list of approved candidates
+    or a list of approval sets in the order of voters. With
+    validate=False the check that approval_sets only refers to voters
+    and cands is skipped; this is meant for profiles built from data
+    that is valid by construction (loaders, generators, copies).
+    """
+
+    def __init__(self, voters, cands, approval_sets, validate=True):
         self.voters = voters
-        if isinstance(approval_sets, collections.Mapping):
+        if isinstance(approval_sets, Mapping):
             self.approval_sets = approval_sets
         elif isinstance(approval_sets, list):
             assert len(approval_sets) == len(voters)
@@ -23,19 +203,36 @@ class ApprovalProfile(object):
         else:
             raise Exception("type of approval_sets neither dict nor list")
         self.cands = cands
-        for v, appr in iteritems(self.approval_sets):
-            for c in appr:
-                if v not in voters:
-                    raise Exception(str(v) + " is not a valid voter; "
-                                    + "voters are " + str(voters)+".")
-                if c not in cands:
-                    raise Exception(str(c) + " is not a valid candidate; "
-                                    + "candidates are " + str(cands) + ".")
+        if validate:
+            _validate(self.voters, self.cands, self.approval_sets)
+        self._build_index()
 
-    def __str__(self):
-        return ("Profile with %d votes and %d candidates: "
-                % (len(self.voters), len(self.cands))
-                + ', '.join(map(str, self.approval_sets.values())))
+    def invalidate_cache(self):
+        """Rebuilds the lookup tables and discards all cached quantities
+        (including the incidence matrix); has to be called after
+        modifying voters, cands or approval_sets."""
+        self._build_index()
+
+    def _build_index(self):
+        """Builds the lookup tables self.voter_index and self.cand_index,
+        which map voters and candidates to their row and column in the
+        incidence matrix, respectively."""
+        self.voter_index = {v: i for i, v in enumerate(self.voters)}
+        self.cand_index = {c: j for j, c in enumerate(self.cands)}
+        self._cache = {}
+
+    def __getstate__(self):
+        # the lookup tables and the cached quantities are not pickled
+        state = dict(self.__dict__)
+        for key in ["voter_index", "cand_index", "_cache"]:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        # also restores profiles pickled before the lookup tables were
+        # introduced
+        self.__dict__.update(state)
+        self._build_index()
 
     def __deepcopy__(self, memodict=None):
         if memodict is None:
@@ -43,13 +240,278 @@ class ApprovalProfile(object):
         voters = list(self.voters)
         approvals_sets = copy.deepcopy(self.approval_sets)
         cands = list(self.cands)
-        return ApprovalProfile(voters, cands, approvals_sets)
+        return ApprovalProfile(voters, cands, approvals_sets, validate=False)
 
-    def has_empty_sets(self):
-        for appr in self.approval_sets.values():
-            if len(appr) == 0:
-                return True
-        return False
+
+def _validate(voters, cands, approval_sets):
+    """Raises an exception if approval_sets refers to a voter not in
+    voters (with a non-empty approval set) or a candidate not in cands."""
+    voter_set = set(voters)
+    cand_set = set(cands)
+    for v, appr in iteritems(approval_sets):
+        if len(appr) == 0:
+            continue
+        if v not in voter_set:
+            raise Exception(str(v) + " is not a valid voter; "
+                            + "voters are " + str(voters) + ".")
+        for c in appr:
+            if c not in cand_set:
+                raise Exception(str(c) + " is not a valid candidate; "
+                                + "candidates are " + str(cands) + ".")
+
+
+class IndexTable(object):
+    """A tuple of voters or candidates together with the position of
+    each of them.
+
+    Tables are interned (see intern_table): all compact profiles with
+    the same voters (or candidates) share one table.
+    """
+    __slots__ = ("items", "index", "__weakref__")
+
+    def __init__(self, items):
+        self.items = tuple(items)
+        self.index = {item: i for i, item in enumerate(self.items)}
+
+
+__interned_tables = weakref.WeakValueDictionary()
+
+
+def intern_table(items):
+    """Returns the IndexTable for the list items (a new one only if no
+    table with these items is in use)."""
+    key = tuple(items)
+    table = __interned_tables.get(key)
+    if table is None:
+        table = IndexTable(key)
+        __interned_tables[key] = table
+    return table
+
+
+COMPACT_CACHE_SIZE = 32
+"""Number of compact profiles whose derived quantities (incidence
+matrix, supporter index, completed profiles, ...) are kept; those of the
+least recently used profile are discarded and recomputed when needed."""
+
+_compact_caches = OrderedDict()
+
+
+def _discard_compact_cache(profile_ref):
+    _compact_caches.pop(profile_ref, None)
+
+
+class CompactApprovalProfile(BaseApprovalProfile):
+    """A memory-efficient, immutable approval profile.
+
+    Voters and candidates are stored in interned IndexTables (voters and
+    cands are tuples) and the approval sets in compressed sparse row
+    format: the approval set of the i-th voter consists of the
+    candidates with positions indices[indptr[i]:indptr[i+1]] (in the
+    order of the original approval set). approval_sets is a read-only
+    view of this data; the incidence matrix and all other derived
+    quantities are computed when needed and not pickled. They are not
+    stored in the profile but cached for the COMPACT_CACHE_SIZE most
+    recently used compact profiles.
+    """
+    __slots__ = ("_voter_table", "_cand_table", "indptr", "indices",
+                 "__weakref__")
+
+    def __init__(self, voters, cands, approval_sets, validate=True):
+        if isinstance(approval_sets, list):
+            assert len(approval_sets) == len(voters)
+            approval_sets = dict(zip(voters, approval_sets))
+        elif not isinstance(approval_sets, Mapping):
+            raise Exception("type of approval_sets neither dict nor list")
+        if validate:
+            _validate(voters, cands, approval_sets)
+        cand_table = intern_table(cands)
+        indptr = [0]
+        indices = []
+        for v in voters:
+            indices.extend(cand_table.index[c]
+                           for c in approval_sets.get(v, ()))
+            indptr.append(len(indices))
+        self._init_csr(intern_table(voters), cand_table,
+                       np.array(indptr, dtype=np.int32),
+                       np.array(indices, dtype=np.int32))
+
+    def _init_csr(self, voter_table, cand_table, indptr, indices):
+        indptr.flags.writeable = False
+        indices.flags.writeable = False
+        self._voter_table = voter_table
+        self._cand_table = cand_table
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def _cache(self):
+        key = weakref.ref(self)
+        cache = _compact_caches.get(key)
+        if cache is None:
+            cache = {}
+            key = weakref.ref(self, _discard_compact_cache)
+            _compact_caches[key] = cache
+            while len(_compact_caches) > COMPACT_CACHE_SIZE:
+                _compact_caches.popitem(last=False)
+        else:
+            _compact_caches.move_to_end(key)
+        return cache
+
+    @property
+    def voters(self):
+        return self._voter_table.items
+
+    @property
+    def cands(self):
+        return self._cand_table.items
+
+    @property
+    def voter_index(self):
+        return self._voter_table.index
+
+    @property
+    def cand_index(self):
+        return self._cand_table.index
+
+    @property
+    def approval_sets(self):
+        return _CSRApprovalSets(self)
+
+    def invalidate_cache(self):
+        """Discards all cached quantities."""
+        _compact_caches.pop(weakref.ref(self), None)
+
+    def _approvals(self):
+        rows = np.repeat(np.arange(len(self.voters)), np.diff(self.indptr))
+        return rows, self.indices.astype(np.int64)
+
+    def compact(self):
+        return self
+
+    def __deepcopy__(self, memodict=None):
+        # compact profiles are immutable
+        return self
+
+    def __reduce__(self):
+        return (_compact_profile_from_csr,
+                (self.voters, self.cands, self.indptr, self.indices))
+
+
+def _compact_profile_from_csr(voters, cands, indptr, indices):
+    profile = CompactApprovalProfile.__new__(CompactApprovalProfile)
+    profile._init_csr(intern_table(voters), intern_table(cands),
+                      np.array(indptr, dtype=np.int32),
+                      np.array(indices, dtype=np.int32))
+    return profile
+
+
+class _CSRApprovalSets(Mapping):
+    """Read-only mapping voter -> approval set (list) of a
+    CompactApprovalProfile."""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __getitem__(self, voter):
+        profile = self.profile
+        i = profile.voter_index[voter]
+        cands = profile.cands
+        return [cands[j] for j in
+                profile.indices[profile.indptr[i]:profile.indptr[i + 1]]
+                .tolist()]
+
+    def __iter__(self):
+        return iter(self.profile.voters)
+
+    def __len__(self):
+        return len(self.profile.voters)
+
+
+class CompletedProfile(ApprovalProfile):
+    """A view of profile with additional voters that approve no
+    candidate (missing_rule "empty") or all candidates ("all").
+
+    The approval sets of profile are not copied; approval_sets is a
+    ChainMap of the added voters' approval sets and those of profile.
+    The incidence matrix, which copies the rows of profile, is only
+    built when needed; the voter support and the approval bitmasks are
+    derived from those of profile. The view must not be modified.
+    """
+
+    def __init__(self, profile, missing, missing_rule):
+        if missing_rule == "empty":
+            missing_sets = {v: [] for v in missing}
+        elif missing_rule == "all":
+            missing_sets = {v: list(profile.cands) for v in missing}
+        else:
+            raise NotImplementedError("missing rule " + str(missing_rule)
+                                      + " unknown")
+        self.profile = profile
+        self.voters = list(profile.voters) + list(missing)
+        self.cands = profile.cands
+        self.approval_sets = ChainMap(missing_sets, profile.approval_sets)
+        self.voter_index = dict(profile.voter_index)
+        for i, v in enumerate(missing, len(profile.voters)):
+            self.voter_index[v] = i
+        self.cand_index = profile.cand_index
+        self.missing_rule = missing_rule
+        self._cache = {}
+
+    @property
+    def incidence(self):
+        def compute():
+            return np.vstack([
+                self.profile.incidence,
+                np.full((len(self._missing()), len(self.cands)),
+                        self.missing_rule == "all", dtype=bool)])
+        return self._cached("incidence", compute)
+
+    def invalidate_cache(self):
+        """Discards all cached quantities."""
+        self._cache = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_cache"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = {}
+
+    def _missing(self):
+        return self.voters[len(self.profile.voters):]
+
+    def voter_support(self):
+        def compute():
+            missing = self._missing()
+            voter_support = self.profile.voter_support()
+            if self.missing_rule == "empty":
+                return ChainMap(dict.fromkeys(missing, 0), voter_support)
+            # the added voters raise the support of every candidate
+            support = {v: s + len(missing) if s > 0 else 0
+                       for v, s in iteritems(voter_support)}
+            max_support = max(self.profile.cand_support().values(),
+                              default=-len(missing))
+            support.update(dict.fromkeys(missing,
+                                         max_support + len(missing)))
+            return support
+        return self._cached("voter_support", compute)
+
+    def approval_bitmasks(self):
+        def compute():
+            if self.missing_rule == "empty":
+                bitmask = 0
+            else:
+                bitmask = (1 << len(self.cands)) - 1
+            return ChainMap(dict.fromkeys(self._missing(), bitmask),
+                            self.profile.approval_bitmasks())
+        return self._cached("approval_bitmasks", compute)
+
+    def __deepcopy__(self, memodict=None):
+        return ApprovalProfile(list(self.voters), list(self.cands),
+                               copy.deepcopy(dict(self.approval_sets)),
+                               validate=False)
 
 
 # uniformly random profile:
@@ -59,7 +521,7 @@ def uniformly_random_profile(voters, cands, approval_set_sizes):
     for v in voters:
         approval_sets[v] = set(random.choice(cands, approval_set_sizes[v],
                                              replace=False))
-    return ApprovalProfile(voters, cands, approval_sets)
+    return ApprovalProfile(voters, cands, approval_sets, validate=False)
 
 
 # create approval profile from 2d coordinates (Euclidean distance)
@@ -72,4 +534,4 @@ def approvalprofile_from_2d_euclidean(voters, cands, voter_points,
         mindist = min(distances.values())
         approval_sets[v] = [c for c in cands
                             if distances[c] <= mindist * threshold]
-    return ApprovalProfile(voters, cands, approval_sets)
+    return ApprovalProfile(voters, cands, approval_sets, validate=False)
@@ -5,6 +5,12 @@
 import sys
 sys.path.insert(0, '..')
 import unittest
+import itertools
+import math
+import pickle
+import random
+from fractions import Fraction
+import numpy as np
 import file_loader
 import perpetual_rules as perpetual
 import profiles
@@ -479,6 +485,637 @@ class TestPerpetualRules(unittest.TestCase):
             choice = perpetual.compute_rule(rule, profile, weights)
             self.assertEqual(choice, expected_choices[i])
 
+    def test_vectorized_weighted_approval(self):
+        decision = {"per_pav": [3, 2, 3, 3, 2, 3],
+                    "per_unitcost": [3, 2, 3, 3, 2, 3],
+                    "per_reset": [3, 2, 3, 2, 3, 2]}
+
+        appsets = {1: [3], 2: [3], 3: [2]}
+        voters = [1, 2, 3]
+        cands = [1, 2, 3, 4]
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+
+        for rule in decision:
+            weights = perpetual.init_weights(rule, voters)
+            exact_weights = perpetual.init_weights(rule, voters)
+            winners = perpetual.compute_rule_sequence(
+                rule, [profile] * 6, weights, vectorized=True)
+            self.assertEqual(winners, decision[rule], msg=rule)
+            perpetual.compute_rule_sequence(rule, [profile] * 6,
+                                            exact_weights)
+            self.assertEqual(weights, exact_weights, msg=rule)
+
+        # weights that are not of the form 1/(k+1) take the generic path
+        weights = {1: Fraction(2, 3), 2: 1, 3: Fraction(1, 4)}
+        exact_weights = dict(weights)
+        self.assertEqual(
+            perpetual.compute_rule_sequence("per_pav", [profile] * 6,
+                                            weights, vectorized=True),
+            perpetual.compute_rule_sequence("per_pav", [profile] * 6,
+                                            exact_weights))
+        self.assertEqual(weights, exact_weights)
+
+    def test_compute_rule_batch(self):
+        voters = [1, 2, 3, 4]
+        cands = [1, 2, 3]
+        histories = [[{1: [1], 2: [1], 3: [2], 4: [3]},
+                      {1: [1], 2: [2], 3: [2], 4: [3]},
+                      {1: [1, 2], 2: [1], 3: [2, 3], 4: [3]}],
+                     [{1: [3], 2: [3], 3: [2], 4: [1, 2]},
+                      {1: [1, 2, 3], 2: [1], 3: [3], 4: [2]},
+                      {1: [3], 2: [1], 3: [2], 4: [1]}]]
+        histories = [[profiles.ApprovalProfile(voters, cands, appsets)
+                      for appsets in history] for history in histories]
+        approvals = [[profile.incidence for profile in history]
+                     for history in histories]
+
+        for rule in perpetual.BATCH_RULES:
+            winners = perpetual.compute_rule_batch(rule, approvals)
+            self.assertEqual(winners.shape, (2, 3))
+            for history, indices in zip(histories, winners):
+                weights = perpetual.init_weights(rule, voters)
+                self.assertEqual(
+                    [cands[i] for i in indices],
+                    perpetual.compute_rule_sequence(rule, history, weights),
+                    msg=rule)
+
+    def test_register_rule(self):
+        def least_approved(profile, weights):
+            winner = min(profile.cands,
+                         key=lambda c: sum(c in profile.approval_sets[v]
+                                           for v in profile.voters))
+            for v in profile.voters:
+                weights[v] += 1
+            return winner
+
+        rule = perpetual.PerpetualRule("least_approved", least_approved,
+                                       initial_weight=5)
+        perpetual.register_rule(rule)
+        try:
+            appsets = {1: [1, 2], 2: [1], 3: [1, 3]}
+            voters = [1, 2, 3]
+            profile = profiles.ApprovalProfile(voters, [1, 2, 3], appsets)
+            weights = perpetual.init_weights("least_approved", voters)
+            self.assertEqual(weights, {1: 5, 2: 5, 3: 5})
+            self.assertEqual(
+                perpetual.compute_rule_sequence("least_approved",
+                                                [profile] * 2, weights),
+                [2, 2])
+            self.assertEqual(weights, {1: 7, 2: 7, 3: 7})
+        finally:
+            del perpetual.RULE_REGISTRY["least_approved"]
+        self.assertRaises(NotImplementedError, perpetual.compute_rule,
+                          "least_approved", profile, weights)
+
+    def test_numeric_backends(self):
+        decision = {"per_pav": [3, 2, 3, 3, 2, 3],
+                    "per_consensus": [3, 2, 3, 3, 2, 3],
+                    "per_nash": [3, 2, 3, 3, 2, 3],
+                    "per_phragmen": [3, 2, 3, 3, 2, 3],
+                    "per_quota": [3, 2, 3, 3, 2, 3],
+                    "per_quota_new": [3, 2, 3, 3, 2, 3],
+                    "per_2nd_prize": [3, 3, 2, 3, 3, 3]}
+
+        appsets = {1: [3], 2: [3], 3: [2]}
+        voters = [1, 2, 3]
+        cands = [1, 2, 3, 4]
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+
+        backends = ["fraction", "float"]
+        try:
+            import gmpy2
+            backends.append("mpq")
+        except ImportError:
+            self.assertRaises(ImportError, perpetual.compute_rule,
+                              "per_pav", profile,
+                              perpetual.init_weights("per_pav", voters),
+                              backend="mpq")
+
+        for backend in backends:
+            for rule in decision:
+                weights = perpetual.init_weights(rule, voters)
+                self.assertEqual(
+                    perpetual.compute_rule_sequence(rule, [profile] * 6,
+                                                    weights,
+                                                    backend=backend),
+                    decision[rule], msg=rule + " with " + backend)
+
+    def test_counter_weights(self):
+        appsets = [{1: [1], 2: [1], 3: [1], 4: [2], 5: [2], 6: [3]},
+                   {1: [1, 2], 2: [2], 3: [1], 4: [2], 5: [3], 6: [3]},
+                   {1: [3], 2: [1, 3], 3: [1], 4: [2], 5: [2], 6: [1]}]
+        voters = [1, 2, 3, 4, 5, 6]
+        cands = [1, 2, 3]
+        profile_list = [profiles.ApprovalProfile(voters, cands, appsets[i])
+                        for i in [0, 1, 1, 2, 0, 0, 2, 1]]
+
+        for rule in ["per_pav", "per_unitcost", "per_reset"]:
+            weights = perpetual.init_weights(rule, voters)
+            counters = perpetual.init_weights(rule, voters, compact=True)
+            self.assertIsInstance(counters, perpetual.CounterWeights)
+            self.assertEqual(
+                perpetual.compute_rule_sequence(rule, profile_list,
+                                                counters),
+                perpetual.compute_rule_sequence(rule, profile_list,
+                                                weights),
+                msg=rule)
+            self.assertEqual(counters.as_dict(), weights, msg=rule)
+
+        self.assertRaises(NotImplementedError, perpetual.init_weights,
+                          "per_nash", voters, compact=True)
+
+    def test_incremental_scores(self):
+        random.seed(7)
+        voters = list(range(12))
+        cands = list(range(5))
+        appsets = [{v: random.sample(cands, random.randint(1, 3))
+                    for v in voters} for _ in range(2)]
+        shared = [profiles.ApprovalProfile(voters, cands, appsets[i])
+                  for i in range(2)]
+        # runs of the same profile object alternate with profile changes
+        profile_list = [shared[0]] * 40 + [shared[1]] * 5 + [shared[0]] * 3
+        copies = [profiles.ApprovalProfile(voters, cands,
+                                           appsets[shared.index(p)])
+                  for p in profile_list]
+
+        for rule in ["per_pav", "per_unitcost", "per_reset",
+                     "per_minmax_dryspell"]:
+            weights = perpetual.init_weights(rule, voters)
+            incremental = perpetual.init_weights(rule, voters)
+            self.assertEqual(
+                perpetual.compute_rule_sequence(rule, profile_list,
+                                                incremental,
+                                                incremental=True),
+                perpetual.compute_rule_sequence(rule, copies, weights),
+                msg=rule)
+            self.assertEqual(incremental, weights, msg=rule)
+
+        # dry spells that are not all equal
+        weights = {v: v % 3 for v in voters}
+        incremental = dict(weights)
+        self.assertEqual(
+            perpetual.compute_rule_sequence("per_minmax_dryspell",
+                                            profile_list, incremental,
+                                            incremental=True),
+            perpetual.compute_rule_sequence("per_minmax_dryspell", copies,
+                                            weights))
+        self.assertEqual(incremental, weights)
+
+        # every rule gives the same results with and without the option
+        for rule in perpetual.RULE_REGISTRY:
+            results = []
+            for incremental in [False, True]:
+                weights = perpetual.init_weights(rule, voters)
+                winners = perpetual.compute_rule_sequence(
+                    rule, profile_list[:8], weights, incremental=incremental,
+                    rng=np.random.default_rng(3))
+                results.append((winners, weights))
+            self.assertEqual(results[0], results[1], msg=rule)
+
+        self.assertRaises(ValueError, perpetual.CounterWeights.from_weights,
+                          "per_unitcost", {1: Fraction(1, 2)})
+
+    def test_phragmen_water_filling(self):
+        voters = [1, 2, 3, 4]
+        cands = ["a", "b"]
+        profile = profiles.ApprovalProfile(
+            voters, cands, {1: ["a"], 2: ["a"], 3: ["a", "b"], 4: ["b"]})
+        weights = {1: 0, 2: Fraction(1, 2), 3: 3, 4: 4}
+        # loads: a -> (1 + 0 + 1/2) / 2 (voter 3 is not raised),
+        #        b -> (1 + 3 + 4) / 2
+        self.assertEqual(perpetual.per_phragmen(profile, weights), "a")
+        self.assertEqual(weights,
+                         {1: Fraction(3, 4), 2: Fraction(3, 4), 3: 3, 4: 4})
+
+    def test_equality_large_weights(self):
+        voters = [1, 2, 3, 4]
+        cands = ["a", "b", "c"]
+        profile = profiles.ApprovalProfile(
+            voters, cands, {1: ["b", "c"], 2: ["a"], 3: ["b", "c"], 4: ["a"]})
+        # a and b have the same number of supporters with weight <= 5,
+        # the tie is broken in favour of the supporter with weight 10**9
+        weights = {1: 5, 2: 5, 3: 10 ** 12, 4: 10 ** 9}
+        self.assertEqual(perpetual.per_equality(profile, weights), "a")
+        self.assertEqual(weights,
+                         {1: 5, 2: 6, 3: 10 ** 12, 4: 10 ** 9 + 1})
+
+    def test_nash_log_scores(self):
+        # with this many voters the epsilon factors underflow as floats
+        voters = list(range(1100))
+        cands = [1, 2, 3]
+        appsets = {v: [1 + v % 3] if v % 5 else [1, 2] for v in voters}
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+        exact_weights = perpetual.init_weights("per_nash", voters)
+        float_weights = perpetual.init_weights("per_nash", voters)
+        for _ in range(4):
+            self.assertEqual(
+                perpetual.per_nash(profile, exact_weights),
+                perpetual.per_nash(profile, float_weights, backend="float"))
+        self.assertEqual(exact_weights, float_weights)
+
+    def test_quota_new_epsilon(self):
+        # duplicates, equal fractional parts and near-equal ones
+        values = [Fraction(1, 3), Fraction(4, 3), Fraction(1, 3), 2, 0,
+                  Fraction(7, 2), 0.5 + 1e-12, 0.5, Fraction(5, 7)]
+        for k in range(1, len(values) + 1):
+            # previous implementation: all pairs of voters
+            diffs = [abs(math.modf(a)[0] - math.modf(b)[0])
+                     for a, b in itertools.combinations(values[:k], 2)]
+            diffs = [d for d in diffs if d > 0]
+            self.assertEqual(perpetual._fractional_gap(values[:k]),
+                             min(diffs) if diffs else None)
+
+    def test_profile_cache(self):
+        appsets = {"a": [2, 3], "b": [], "c": [3], "d": [1, 3]}
+        profile = profiles.ApprovalProfile(["a", "b", "c", "d"], [1, 2, 3],
+                                           appsets)
+        self.assertEqual(profile.cand_support(), {1: 1, 2: 1, 3: 3})
+        self.assertEqual(profile.voter_support(),
+                         {"a": 3, "b": 0, "c": 3, "d": 3})
+        self.assertEqual(profile.supporters(3), ["a", "c", "d"])
+        self.assertIs(profile.cand_support(), profile.cand_support())
+        self.assertEqual(profile.approval_bitmasks(),
+                         {"a": 0b110, "b": 0, "c": 0b100, "d": 0b101})
+        self.assertEqual(profile.bitmask_cands(0b101), [1, 3])
+
+        appsets["b"] = [1]
+        profile.invalidate_cache()
+        self.assertEqual(profile.cand_support(), {1: 2, 2: 1, 3: 3})
+        self.assertEqual(profile.supporters(1), ["b", "d"])
+
+    def test_subtraction_rules(self):
+        voters = [1, 2, 3]
+        cands = ["a", "b"]
+        profile = profiles.ApprovalProfile(voters, cands,
+                                           {1: ["a"], 2: ["a"], 3: ["b"]})
+        weights = {v: 1 for v in voters}
+        self.assertEqual(perpetual.per_consensus(profile, weights), "a")
+        self.assertEqual(weights, {1: Fraction(1, 2), 2: Fraction(1, 2),
+                                   3: 2})
+        weights = {v: 1 for v in voters}
+        self.assertEqual(perpetual.per_2nd_prize(profile, weights), "a")
+        self.assertEqual(weights, {1: 1.5, 2: 1.5, 3: 2})
+
+        # nobody with a positive weight approves the winner
+        weights = {1: 0, 2: 0, 3: 0}
+        self.assertEqual(perpetual.per_2nd_prize(profile, weights), "a")
+        self.assertEqual(weights, {1: 1, 2: 1, 3: 1})
+
+        # a candidate listed twice in an approval set is approved once
+        profile = profiles.ApprovalProfile(voters, [1, 2],
+                                           {1: [1, 1], 2: [2], 3: [2]})
+        weights = {v: 1 for v in voters}
+        self.assertEqual([perpetual.per_consensus(profile, weights)
+                          for _ in range(4)], [2, 1, 2, 2])
+        self.assertEqual(weights, {1: 2, 2: Fraction(1, 2),
+                                   3: Fraction(1, 2)})
+
+    def test_tie_outcomes(self):
+        voters = [1, 2, 3]
+        cands = ["a", "b", "c"]
+        profile = profiles.ApprovalProfile(voters, cands,
+                                           {1: ["a"], 2: ["b"], 3: ["c"]})
+        weights = perpetual.init_weights("per_pav", voters)
+        self.assertEqual(perpetual.tied_winners("per_pav", profile, weights),
+                         cands)
+        self.assertEqual(weights, {1: 1, 2: 1, 3: 1})
+        self.assertEqual(
+            perpetual.compute_rule("per_pav", profile, weights,
+                                   tiebreaking=lambda tied: tied[-1]), "c")
+
+        # per_pav picks every candidate once per three rounds
+        weights = perpetual.init_weights("per_pav", voters)
+        tie_tree = perpetual.compute_rule_ties("per_pav", [profile] * 6,
+                                               weights)
+        self.assertEqual(perpetual.count_winner_sequences(tie_tree), 36)
+        sequences = list(perpetual.winner_sequences(tie_tree))
+        self.assertEqual(len(sequences), 36)
+        self.assertIn(perpetual.compute_rule_sequence("per_pav",
+                                                      [profile] * 6,
+                                                      weights),
+                      sequences)
+        # states reached with the same winners in any order are merged
+        self.assertEqual([len(successors) for successors in tie_tree],
+                         [1, 3, 3, 1, 3, 3])
+
+    def test_random_rules_rng(self):
+        sampler = perpetual.AliasSampler([1, 0, 3])
+        rng = np.random.default_rng(0)
+        draws = [sampler.draw(rng) for _ in range(4000)]
+        self.assertEqual(draws.count(1), 0)
+        self.assertAlmostEqual(draws.count(2) / 4000., 0.75, delta=0.03)
+
+        voters = [1, 2, 3, 4]
+        cands = ["a", "b", "c"]
+        profile = profiles.ApprovalProfile(
+            voters, cands, {1: ["a"], 2: ["b", "c"], 3: ["c"], 4: ["a"]})
+        for rule in ["random_dictatorship", "random_serial_dictatorship",
+                     "weighted_random_dictatorship"]:
+            results = []
+            for _ in range(2):
+                rngs = perpetual.election_rngs(42, 3)
+                results.append([perpetual.compute_rule_sequence(
+                    rule, [profile] * 10,
+                    perpetual.init_weights(rule, voters), rng=rng)
+                    for rng in rngs])
+            self.assertEqual(results[0], results[1], msg=rule)
+            self.assertNotEqual(results[0][0], results[0][1], msg=rule)
+
+    def test_rotation_weights(self):
+        voters = [5, 2, 7, 1]
+        cands = ["a", "b"]
+        appsets = [{5: ["a"], 2: ["b"], 7: ["a"], 1: []},
+                   {5: ["b"], 2: [], 7: ["b"], 1: ["a"]},
+                   {5: [], 2: ["a"], 7: [], 1: ["b"]}]
+        profile_list = [profiles.ApprovalProfile(voters, cands, appsets[i])
+                        for i in [0, 1, 2, 2, 0, 1, 1, 0, 2, 0]]
+
+        weights = perpetual.init_weights("rotating_dictatorship", voters)
+        rotation = perpetual.init_weights("rotating_dictatorship", voters,
+                                          compact=True)
+        self.assertIsInstance(rotation, perpetual.RotationWeights)
+        for profile in profile_list:
+            self.assertEqual(
+                perpetual.compute_rule("rotating_dictatorship", profile,
+                                       rotation, missing_rule="ignore"),
+                perpetual.compute_rule("rotating_dictatorship", profile,
+                                       weights, missing_rule="ignore"))
+            self.assertEqual(rotation.as_dict(), weights)
+
+        # the same profile object in consecutive rounds
+        shared = [profiles.ApprovalProfile(voters, cands, appsets[i])
+                  for i in range(3)]
+        for i in [2, 2, 2, 1, 1, 0, 0, 0, 2, 2]:
+            self.assertEqual(
+                perpetual.compute_rule("rotating_dictatorship", shared[i],
+                                       rotation, missing_rule="ignore"),
+                perpetual.compute_rule("rotating_dictatorship", shared[i],
+                                       weights, missing_rule="ignore"))
+            self.assertEqual(rotation.as_dict(), weights)
+        self.assertEqual(pickle.loads(pickle.dumps(rotation)).as_dict(),
+                         weights)
+
+        for rule in ["rotating_dictatorship", "rotating_serial_dictatorship"]:
+            weights = perpetual.init_weights(rule, voters)
+            rotation = perpetual.init_weights(rule, voters, compact=True)
+            self.assertIsInstance(rotation, perpetual.RotationWeights)
+            for profile in profile_list + profile_list:
+                self.assertEqual(
+                    perpetual.compute_rule(rule, profile, rotation,
+                                           missing_rule="ignore"),
+                    perpetual.compute_rule(rule, profile, weights,
+                                           missing_rule="ignore"),
+                    msg=rule)
+                self.assertEqual(rotation.as_dict(), weights, msg=rule)
+
+    def test_dryspell_weights(self):
+        voters = [1, 2, 3, 4, 5]
+        cands = ["a", "b", "c"]
+        appsets = [{1: ["a"], 2: ["b"], 3: ["b", "c"], 4: ["c"], 5: ["a"]},
+                   {1: ["c"], 2: ["a"], 3: ["a"], 4: ["b"], 5: ["b"]}]
+        profile_list = [profiles.ApprovalProfile(voters, cands, appsets[i])
+                        for i in [0, 0, 1, 0, 1, 1, 0, 0, 1]]
+        # voter 5 is missing in one round
+        profile_list.insert(4, profiles.ApprovalProfile(
+            voters[:4], cands, {1: ["a"], 2: ["a"], 3: ["b"], 4: ["b"]}))
+
+        weights = perpetual.init_weights("per_minmax_dryspell", voters)
+        buckets = perpetual.init_weights("per_minmax_dryspell", voters,
+                                         compact=True)
+        self.assertIsInstance(buckets, perpetual.DryspellWeights)
+        for profile in profile_list:
+            self.assertEqual(
+                perpetual.compute_rule("per_minmax_dryspell", profile,
+                                       buckets, missing_rule="ignore"),
+                perpetual.compute_rule("per_minmax_dryspell", profile,
+                                       weights, missing_rule="ignore"))
+            self.assertEqual(buckets.as_dict(), weights)
+
+    def test_completed_profile(self):
+        appsets = {1: [1], 2: [1, 2]}
+        profile = profiles.ApprovalProfile([1, 2], [1, 2], appsets)
+        completed = profile.completed([3, 1, 2], "all")
+        self.assertEqual(completed.voters, [1, 2, 3])
+        self.assertIs(completed.approval_sets[2], appsets[2])
+        self.assertEqual(completed.approval_sets[3], [1, 2])
+        # derived from profile without building the incidence matrix
+        self.assertEqual(completed.voter_support(), {1: 3, 2: 3, 3: 3})
+        self.assertEqual(dict(completed.approval_bitmasks()),
+                         {1: 0b01, 2: 0b11, 3: 0b11})
+        self.assertEqual(completed.supporters(2), [2, 3])
+        self.assertNotIn("incidence", completed._cache)
+        empty = profile.completed([1, 2, 3], "empty")
+        self.assertEqual(dict(empty.voter_support()), {1: 2, 2: 2, 3: 0})
+        self.assertEqual(dict(empty.approval_bitmasks()),
+                         {1: 0b01, 2: 0b11, 3: 0})
+        self.assertEqual(completed.incidence.tolist(),
+                         [[True, False], [True, True], [True, True]])
+        self.assertIs(profile.completed([1, 2], "empty"), profile)
+        self.assertIs(profile.completed([1, 2, 3], "empty", cache=True),
+                      profile.completed([1, 2, 3], "empty", cache=True))
+        self.assertEqual(
+            perpetual.compute_rule("av", profile, {1: 1, 2: 1, 3: 1},
+                                   missing_rule="empty",
+                                   cache_profiles=True), 1)
+
+    def test_profile_validation(self):
+        self.assertRaises(Exception, profiles.ApprovalProfile,
+                          [1, 2], ["a"], {1: ["a"], 3: ["a"]})
+        self.assertRaises(Exception, profiles.ApprovalProfile,
+                          [1, 2], ["a"], {1: ["a"], 2: ["b"]})
+        # voters that approve nothing need not be listed
+        profiles.ApprovalProfile([1], ["a"], {1: ["a"], 2: []})
+        profile = profiles.ApprovalProfile([1, 2], ["a", "b"],
+                                           [["a"], ["a", "b"]],
+                                           validate=False)
+        self.assertEqual(profile.cand_support(), {"a": 2, "b": 1})
+
+    def test_compact_profile(self):
+        voters = [3, 1, 2]
+        cands = ["a", "b", "c"]
+        appsets = {3: ["c", "a"], 1: [], 2: ["b"]}
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+        compact = profiles.CompactApprovalProfile(voters, cands, appsets)
+        self.assertEqual(dict(compact.approval_sets), appsets)
+        self.assertEqual(compact.incidence.tolist(),
+                         profile.incidence.tolist())
+        self.assertIs(compact.voter_index,
+                      profile.compact().voter_index)
+        self.assertFalse(hasattr(compact, "__dict__"))
+        self.assertEqual(compact.voters, (3, 1, 2))
+        self.assertIsInstance(compact.cands, tuple)
+
+        # derived quantities are only kept for the most recently used
+        # compact profiles
+        others = [profiles.CompactApprovalProfile(voters, cands, appsets)
+                  for _ in range(profiles.COMPACT_CACHE_SIZE + 1)]
+        support = compact.cand_support()
+        self.assertIs(compact.cand_support(), support)
+        for other in others:
+            other.cand_support()
+        self.assertEqual(len(profiles._compact_caches),
+                         profiles.COMPACT_CACHE_SIZE)
+        self.assertIsNot(compact.cand_support(), support)
+        self.assertEqual(compact.cand_support(), support)
+        del others
+
+        copied = pickle.loads(pickle.dumps([compact, compact]))
+        self.assertIs(copied[0].cands, copied[1].cands)
+        self.assertEqual(dict(copied[0].approval_sets), appsets)
+        for rule in ["per_pav", "per_quota", "rotating_dictatorship"]:
+            self.assertEqual(
+                perpetual.compute_rule_sequence(
+                    rule, [profile] * 4,
+                    perpetual.init_weights(rule, voters),
+                    missing_rule="ignore"),
+                perpetual.compute_rule_sequence(
+                    rule, [compact] * 4,
+                    perpetual.init_weights(rule, voters),
+                    missing_rule="ignore"))
+
+    def test_perpetual_election(self):
+        voters = [1, 2, 3]
+        cands = ["a", "b", "c"]
+        profile = profiles.ApprovalProfile(
+            voters, cands, {1: ["a"], 2: ["a", "b"], 3: ["c"]})
+        for rule in ["per_pav", "per_quota"]:
+            expected = perpetual.compute_rule_sequence(
+                rule, [profile] * 6, perpetual.init_weights(rule, voters))
+
+            election = perpetual.PerpetualElection(rule, voters)
+            election.run([profile] * 3)
+            snapshot = election.snapshot()
+            self.assertIs(snapshot.weights, election.weights)
+            election.run([profile] * 3)
+            self.assertEqual(election.winners, expected, msg=rule)
+            self.assertEqual(snapshot.round, 3)
+
+            resumed = perpetual.PerpetualElection.from_bytes(
+                snapshot.to_bytes())
+            resumed.run([profile] * 3)
+            self.assertEqual(resumed.winners, expected, msg=rule)
+
+            election.restore(snapshot)
+            self.assertEqual(election.round, 3)
+            self.assertEqual(election.run([profile] * 3), expected[3:])
+
+    def test_iter_rule_sequence(self):
+        aps, voters = file_loader.start_file_load("unittests/simple")
+        lazy = file_loader.iter_file_load("unittests/simple")
+        self.assertEqual([p.approval_sets for p in lazy],
+                         [p.approval_sets for p in aps])
+
+        rule = "per_pav"
+        expected_weights = perpetual.init_weights(rule, voters)
+        expected = perpetual.compute_rule_sequence(rule, aps,
+                                                   expected_weights)
+        weights = perpetual.init_weights(rule, voters)
+        stream = perpetual.iter_rule_sequence(
+            rule, file_loader.iter_file_load("unittests/simple"), weights,
+            incremental=True, with_weights=True)
+        winner, round_weights = next(stream)
+        self.assertEqual(winner, expected[0])
+        self.assertIsInstance(round_weights, perpetual.CounterWeights)
+        self.assertEqual([winner] + [w for w, _ in stream], expected)
+        self.assertEqual(weights, expected_weights)
+
+        # closing the stream early writes back the weights of the rounds
+        expected_weights = perpetual.init_weights(rule, voters)
+        perpetual.compute_rule_sequence(rule, aps[:2], expected_weights)
+        weights = perpetual.init_weights(rule, voters)
+        stream = perpetual.iter_rule_sequence(rule, aps, weights,
+                                              incremental=True)
+        self.assertEqual([next(stream), next(stream)], expected[:2])
+        stream.close()
+        self.assertEqual(weights, expected_weights)
+
+    def test_single_pass_experiment(self):
+        sys.path.insert(0, "experiments")
+        import experiments
+
+        random.seed(11)
+        voters = list(range(6))
+        cands = list(range(4))
+        history = [profiles.ApprovalProfile(
+            voters, cands, {v: random.sample(cands, random.randint(1, 3))
+                            for v in voters}) for _ in range(8)]
+        rules = ["av", "per_pav", "per_unitcost", "per_reset", "per_nash",
+                 "per_phragmen", "per_quota", "per_minmax_dryspell",
+                 "rotating_dictatorship", "random_dictatorship",
+                 "random_serial_dictatorship"]
+
+        single_pass = [{rule: [] for rule in rules} for _ in range(4)]
+        experiments.run_exp_for_history(history, *single_pass, rules=rules,
+                                        rng=np.random.default_rng(5))
+
+        # each rule on its own, with the generators spawned for the rules
+        per_rule = [{rule: [] for rule in rules} for _ in range(4)]
+        rngs = perpetual.spawn_rngs(np.random.default_rng(5), len(rules))
+        for rule, rng in zip(rules, rngs):
+            weights = perpetual.init_weights(rule, voters)
+            winners = perpetual.compute_rule_sequence(rule, history, weights,
+                                                      rng=rng)
+            experiments.add_statistics(history, voters, winners, rule,
+                                       *per_rule)
+        self.assertEqual(single_pass, per_rule)
+
+        # the streams of the rules are independent
+        rng = np.random.default_rng(5)
+        draws = [child.integers(2**32, size=4).tolist()
+                 for child in perpetual.spawn_rngs(rng, 3)]
+        self.assertEqual(len(set(map(tuple, draws))), 3)
+
+    def test_supporter_index(self):
+        appsets = {"a": [2, 3], "b": [], "c": [3, 3], "d": [1, 3]}
+        voters = ["a", "b", "c", "d"]
+        cands = [1, 2, 3]
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+        indptr, indices = profile.supporter_index()
+        self.assertEqual(indptr.tolist(), [0, 1, 2, 5])
+        self.assertEqual(indices.tolist(), [3, 0, 0, 2, 3])
+        self.assertEqual(profile.supporter_indices(3).tolist(), [0, 2, 3])
+        self.assertEqual(profile.cand_support(), {1: 1, 2: 1, 3: 3})
+
+        compact = profile.compact()
+        completed = profile.completed(voters + ["e"], "all")
+        for c in cands:
+            self.assertEqual(compact.supporters(c), profile.supporters(c))
+            self.assertEqual(completed.supporters(c),
+                             profile.supporters(c) + ["e"])
+
+    def test_incidence_matrix(self):
+        appsets = {"a": [2, 3], "b": [], "c": [1]}
+        voters = ["a", "b", "c"]
+        cands = [3, 2, 1]
+        profile = profiles.ApprovalProfile(voters, cands, appsets)
+        # the dense matrix is only built when it is used
+        self.assertEqual(profile.voter_support(), {"a": 1, "b": 0, "c": 1})
+        self.assertEqual(profile.supporters(3), ["a"])
+        self.assertNotIn("incidence", profile._cache)
+
+        self.assertEqual(profile.incidence.shape, (3, 3))
+        for v in voters:
+            for c in cands:
+                self.assertEqual(
+                    profile.incidence[profile.voter_index[v],
+                                      profile.cand_index[c]],
+                    c in appsets[v])
+        self.assertEqual(list(profile.incidence.sum(axis=0)), [1, 1, 1])
+        self.assertEqual(profile.packed_incidence().shape, (3, 1))
+        self.assertEqual(profile.packed_incidence()[:, 0].tolist(),
+                         [0b011, 0, 0b100])
+
+        restored = pickle.loads(pickle.dumps(profile))
+        self.assertTrue((restored.incidence == profile.incidence).all())
+        # profiles pickled without the incidence matrix
+        old = profiles.ApprovalProfile.__new__(profiles.ApprovalProfile)
+        old.__setstate__({"voters": voters, "cands": cands,
+                          "approval_sets": appsets})
+        self.assertEqual(old.voter_index, profile.voter_index)
+        self.assertEqual(perpetual.compute_rule(
+            "av", old, perpetual.init_weights("av", voters),
+            missing_rule="ignore"), 3)
+
 
 if __name__ == '__main__':
     unittest.main()